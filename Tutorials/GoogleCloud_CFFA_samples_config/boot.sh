@@ -9,4 +9,4 @@ echo "Creating soft links to shared"
 ln -s shared/templates templates
 ln -s shared/static static
 echo "Starting gunicorn"
-exec gunicorn -b :5000 --certfile=/home/cffa/shared/certs/cffa-selfsigned.crt --keyfile=/home/cffa/shared/certs/cffa-selfsigned.key --log-level=debug --preload --access-logfile - --error-logfile - -w 1 server:app
+exec gunicorn -b :5000 --certfile=/home/cffa/shared/certs/cffa-selfsigned.crt --keyfile=/home/cffa/shared/certs/cffa-selfsigned.key --log-level=debug --access-logfile - --error-logfile - --preload 'server:create_app()'
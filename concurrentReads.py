@@ -0,0 +1,65 @@
+""" Concurrent fan-out of independent DB reads for CFFA pages.
+
+Pages such as the entry screen (summaries, recent games, all games, recent transactions) and the player summary
+(summary, ledger, games) make several independent reads, one after the other, so the page waits for the sum of their
+round trips. ReadFanOut runs such reads together on a shared thread pool and waits for them all, so the page only
+waits for the slowest. pymongo releases the GIL while waiting on the network, so threads overlap the round trips as
+an async driver would, while cffadb and the rest of CFFA stay synchronous.
+
+Reads run outside the request context: bind anything taken from flask g or the session before fanning out.
+
+Example:
+
+db = g.db
+summary, games = reads.gather(lambda: db.get_summary_for_player(name), lambda: db.get_games_for_player(name))
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class ReadFanOut:
+    """ Runs independent blocking reads concurrently.
+
+    Attributes
+    ----------
+
+    max_workers : int
+        Threads shared by all requests of the process. A read waits for a free thread when all are busy.
+
+    """
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cffa-read")
+
+    def gather(self, *reads):
+        """ Call each read concurrently and return their results.
+
+        Parameters
+        ----------
+
+        reads : callable
+            Functions taking no arguments. The first is called in the calling thread, which would otherwise be idle.
+
+        Returns
+        -------
+
+        :list
+            Result of each read, in the order given. If any read raises, its exception is raised once all reads have
+            finished.
+        """
+        if len(reads) < 2:
+            return [read() for read in reads]
+
+        futures = [self._pool.submit(read) for read in reads[1:]]
+        try:
+            first = reads[0]()
+        finally:
+            # wait for the others even if the first failed, so no read outlives the request
+            wait(futures)
+
+        return [first] + [future.result() for future in futures]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
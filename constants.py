@@ -32,3 +32,53 @@ TRANSACTION_SRC_WKSHEET = 'TRANSACTION_SRC_WKSHEET'
 GAME_SRC_WKSHEET = 'GAME_SRC_WKSHEET'
 CFFA_USERID = 'CFFA_USERID'
 SUMMARY_SRC_WKSHEET = 'SUMMARY_SRC_WKSHEET'
+
+""" Tenancy cache tuning
+"""
+
+TENANT_CACHE_SIZE = 'TENANT_CACHE_SIZE'
+TENANT_CACHE_TTL = 'TENANT_CACHE_TTL'
+TENANT_CACHE_SYNC = 'TENANT_CACHE_SYNC'
+
+""" Background jobs
+"""
+
+JOB_WORKERS = 'JOB_WORKERS'
+
+""" Concurrent DB reads
+"""
+
+READ_WORKERS = 'READ_WORKERS'
+
+""" Conditional GET of pages
+"""
+
+PAGE_ETAG_WINDOW = 'PAGE_ETAG_WINDOW'
+STREAM_BUFFER = 'STREAM_BUFFER'
+
+""" Response compression
+"""
+
+COMPRESS_MIN_SIZE = 'COMPRESS_MIN_SIZE'
+COMPRESS_GZIP_LEVEL = 'COMPRESS_GZIP_LEVEL'
+COMPRESS_BROTLI_QUALITY = 'COMPRESS_BROTLI_QUALITY'
+
+""" MongoDB connection pool and replica set read routing, see mongoConnection
+"""
+
+BACKEND_REPLICASET = 'BACKEND_REPLICASET'
+BACKEND_MAX_POOL_SIZE = 'BACKEND_MAX_POOL_SIZE'
+BACKEND_MIN_POOL_SIZE = 'BACKEND_MIN_POOL_SIZE'
+BACKEND_MAX_IDLE_TIME_MS = 'BACKEND_MAX_IDLE_TIME_MS'
+BACKEND_WAIT_QUEUE_TIMEOUT_MS = 'BACKEND_WAIT_QUEUE_TIMEOUT_MS'
+BACKEND_CONNECT_TIMEOUT_MS = 'BACKEND_CONNECT_TIMEOUT_MS'
+BACKEND_SOCKET_TIMEOUT_MS = 'BACKEND_SOCKET_TIMEOUT_MS'
+BACKEND_SERVER_SELECTION_TIMEOUT_MS = 'BACKEND_SERVER_SELECTION_TIMEOUT_MS'
+BACKEND_READ_PREFERENCE = 'BACKEND_READ_PREFERENCE'
+BACKEND_MAX_STALENESS_SECONDS = 'BACKEND_MAX_STALENESS_SECONDS'
+READ_YOUR_WRITES_WINDOW = 'READ_YOUR_WRITES_WINDOW'
+
+""" Request profiling, see requestProfiler
+"""
+
+PROFILE_DIRECTORY = 'PROFILE_DIRECTORY'
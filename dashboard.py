@@ -0,0 +1,191 @@
+""" Cached per tenant dashboard snapshot for the CFFA manager entry screen.
+
+The entry screen shows the active balances, full player summary, recent games, all games and recent transactions.
+Managers refresh it constantly but the data only changes when a game, transaction or player is changed, so the reads
+are done once per data version and the result is shared by every request for the same tenant.
+
+The recent games and recent transactions lists depend on the current date as well as the data, so snapshots also
+expire after max_age seconds even if the data version has not moved.
+
+TenantViewCache is the general form of the dashboard cache and is used for any other per tenant view that should only
+be rebuilt when the data version changes, such as the paged transactions listing.
+
+"""
+
+import itertools
+import threading
+import time
+from cachetools import LRUCache
+import paging
+import viewModels
+import logging
+
+# logging config
+logger = logging.getLogger("cffa_dashboard")
+logger.setLevel(logging.DEBUG)
+# console handler
+ch = logging.StreamHandler()
+ch.setLevel(logging.DEBUG)
+formatting = logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+ch.setFormatter(formatting)
+logger.addHandler(ch)
+
+
+class DashboardSnapshot:
+    """ Immutable view of the entry screen data for one tenant at one data version. Treat the lists as read only as
+    the snapshot is shared between requests.
+
+    Attributes
+    ----------
+
+    version : int
+        Tenant data version the snapshot was built from.
+
+    player_summaries : `list` of `viewModels.SummaryRow`
+        Active player balances.
+
+    all_players : `list` of `viewModels.SummaryRow`
+        Full player summary.
+
+    recent_games : `list` of `viewModels.GameRow`
+        From get_recent_games()
+
+    games : paging.KeysetList
+        From get_all_games(), for paged display with a viewModels.GameRow per game.
+
+    recent_transactions : `list` of `viewModels.TransactionRow`
+        From get_recent_transactions()
+
+    """
+
+    def __init__(self, version, player_summaries, all_players, recent_games, all_games, recent_transactions):
+        self.version = version
+        self.player_summaries = viewModels.summary_rows(player_summaries)
+        self.all_players = viewModels.summary_rows(all_players)
+        self.recent_games = viewModels.game_rows(recent_games)
+        self.games = paging.KeysetList(all_games, paging.GAME_DATE_KEY, viewModels.GameRow)
+        self.recent_transactions = viewModels.transaction_rows(recent_transactions)
+
+    @classmethod
+    def build(cls, tenant, version, reads=None):
+        """ Read the dashboard data from the DB.
+
+        Parameters
+        ----------
+
+        tenant : tenantContext.TenantContext
+            Tenancy to read, from its read_db.
+
+        version : int
+            Tenant data version read before calling this method.
+
+        reads : concurrentReads.ReadFanOut
+            Runs the reads concurrently. None reads them one after the other.
+
+        Returns
+        -------
+
+        :DashboardSnapshot
+        """
+        calls = [tenant.read_db.get_active_player_summary,
+                 tenant.read_db.get_full_summary,
+                 tenant.read_db.get_recent_games,
+                 tenant.read_db.get_all_games,
+                 tenant.read_db.get_recent_transactions]
+        if reads is None:
+            active_players, all_players, recent_games, all_games, recent_transactions = [call() for call in calls]
+        else:
+            active_players, all_players, recent_games, all_games, recent_transactions = reads.gather(*calls)
+
+        return cls(version,
+                   active_players,
+                   all_players,
+                   recent_games,
+                   all_games,
+                   recent_transactions)
+
+
+class TenantViewCache:
+    """ Thread safe tenant_id keyed cache of a view of the tenant's data. A view is only rebuilt when the tenant data
+    version has moved on from the version it was built from, or it is older than max_age.
+
+    Attributes
+    ----------
+
+    versions : dataVersion.TenantDataVersions
+        Source of the current tenant data versions.
+
+    build : callable
+        build(tenant, version) returns the view for a tenantContext.TenantContext.
+
+    maxsize : int
+        Maximum number of tenant views held before the least recently used is evicted.
+
+    max_age : int
+        Seconds after which a view is rebuilt regardless of version.
+
+    """
+
+    def __init__(self, versions, build, maxsize=256, max_age=3600):
+        self.versions = versions
+        self.build = build
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self._views = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._builds = itertools.count()
+
+    def get(self, tenant):
+        """ Current view for a tenant, rebuilt if the tenant data version has changed.
+
+        Parameters
+        ----------
+
+        tenant : tenantContext.TenantContext
+            Tenancy of the request.
+
+        Returns
+        -------
+
+        The object returned by build.
+        """
+        return self.get_keyed(tenant)[1]
+
+    def get_keyed(self, tenant):
+        """ As get, also returning a key that identifies this build of the view, eg: for server.fragment_key. The key
+        changes whenever the view is rebuilt, whether for a new data version or on reaching max_age, so anything
+        cached under it lives no longer than the view.
+
+        Returns
+        -------
+
+        :tuple
+            (build key, view)
+        """
+        version = self.versions.get(tenant.tenant_id)
+        with self._lock:
+            cached = self._views.get(tenant.tenant_id)
+
+        if cached is not None and cached[0] == version and time.monotonic() - cached[1] < self.max_age:
+            return cached[3], cached[2]
+
+        logger.debug("Building view for tenant " + str(tenant.tenant_id) + " version " + str(version))
+        view = self.build(tenant, version)
+        key = "{}.{}".format(version, next(self._builds))
+        with self._lock:
+            current = self._views.get(tenant.tenant_id)
+            # another thread may have built a newer view whilst this one was being read
+            if current is None or current[0] <= version:
+                self._views[tenant.tenant_id] = (version, time.monotonic(), view, key)
+
+        return key, view
+
+
+class DashboardCache(TenantViewCache):
+    """ TenantViewCache of DashboardSnapshot objects for the entry screen, with the snapshot reads run concurrently by
+    reads (a concurrentReads.ReadFanOut) if given. """
+
+    def __init__(self, versions, maxsize=256, max_age=3600, reads=None):
+        TenantViewCache.__init__(self, versions,
+                                 lambda tenant, version: DashboardSnapshot.build(tenant, version, reads),
+                                 maxsize, max_age)
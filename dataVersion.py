@@ -0,0 +1,119 @@
+""" Per tenant data version counters for CFFA.
+
+Every route that changes a team's data bumps the team's data version after the write. Anything cached per tenant
+(dashboard snapshots, rendered fragments etc) records the version it was built from, and is rebuilt only when the
+current version differs. Versions are held in MongoDB rather than in memory so that every worker and every CFFA
+pod behind the load balancer sees the same version.
+
+Readers must fetch the version before reading the data it describes, and writers bump it after writing, so a cached
+object can only ever be older than its version and never newer.
+
+Each bump also records when the data changed, which is used for Last-Modified headers.
+
+"""
+
+from pymongo import ReturnDocument
+import logging
+
+# logging config
+logger = logging.getLogger("cffa_dataVersion")
+logger.setLevel(logging.DEBUG)
+# console handler
+ch = logging.StreamHandler()
+ch.setLevel(logging.DEBUG)
+formatting = logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+ch.setFormatter(formatting)
+logger.addHandler(ch)
+
+VERSION_COLLECTION = "tenantDataVersions"
+
+
+class TenantDataVersions:
+    """ Reads and bumps data versions, one document per tenant keyed by tenant_id.
+
+    Attributes
+    ----------
+
+    collection : pymongo.collection.Collection
+        Collection holding {_id: tenant_id, version: int, updated: datetime} documents.
+
+    """
+
+    def __init__(self, database):
+        """ Initialise against the CFFA database.
+
+        Parameters
+        ----------
+
+        database : pymongo.database.Database
+            CFFA mongoDB database. The tenantDataVersions collection is created on first bump.
+
+        """
+        self.collection = database[VERSION_COLLECTION]
+
+    def get(self, tenant_id):
+        """ Current data version of a tenant.
+
+        Parameters
+        ----------
+
+        tenant_id : str
+            TenantContext.tenant_id
+
+        Returns
+        -------
+
+        :int
+            0 if the tenant has never been bumped.
+
+        """
+        document = self.collection.find_one({"_id": tenant_id}, {"version": 1})
+        if document is None:
+            return 0
+
+        return document.get("version", 0)
+
+    def stamp(self, tenant_id):
+        """ Current data version of a tenant and when it was last bumped.
+
+        Parameters
+        ----------
+
+        tenant_id : str
+            TenantContext.tenant_id
+
+        Returns
+        -------
+
+        :tuple
+            (version, datetime in UTC or None if the tenant has never been bumped)
+
+        """
+        document = self.collection.find_one({"_id": tenant_id}, {"version": 1, "updated": 1})
+        if document is None:
+            return 0, None
+
+        return document.get("version", 0), document.get("updated")
+
+    def bump(self, tenant_id):
+        """ Increment the data version of a tenant. Call after every write to the tenant's collections.
+
+        Parameters
+        ----------
+
+        tenant_id : str
+            TenantContext.tenant_id
+
+        Returns
+        -------
+
+        :int
+            The new version.
+
+        """
+        document = self.collection.find_one_and_update({"_id": tenant_id},
+                                                       {"$inc": {"version": 1}, "$currentDate": {"updated": True}},
+                                                       upsert=True,
+                                                       return_document=ReturnDocument.AFTER)
+        logger.debug("Tenant " + str(tenant_id) + " data version now " + str(document.get("version")))
+        return document.get("version")
@@ -252,13 +252,13 @@ class EditGameSelectForm(FlaskForm):
       Attributes
       ----------
 
-      game : SelectField
-        User is show a pull-down list of games. Integer value is used for indexing hence coerce=int
+      game : HiddenField
+        Database ID of the game, as a string, set by the typeahead game picker.
       submitedit : SubmitField
         wtform simple submit button
 
         """
-    game = SelectField(u'Game', coerce=int)
+    game = HiddenField(u'Game')
     submitedit = SubmitField("Edit Game")
 
     def validate(self):
@@ -267,7 +267,7 @@ class EditGameSelectForm(FlaskForm):
 
         result = True
 
-        if self.game.data is None:
+        if not self.game.data:
             self.game.errors.append("Game must be selected first, or maybe play a game!")
             result = False
 
@@ -281,13 +281,13 @@ class DeleteGameSelectForm(FlaskForm):
       Attributes
       ----------
 
-      game : SelectField
-        User is show a pull-down list of games. Integer value is used for indexing hence coerce=int
+      game : HiddenField
+        Database ID of the game, as a string, set by the typeahead game picker.
       submitdel : SubmitField
         wtform simple submit button
 
         """
-    game = SelectField(u'Game', coerce=int)
+    game = HiddenField(u'Game')
     submitdel = SubmitField("Delete Game")
 
     def validate(self):
@@ -296,7 +296,7 @@ class DeleteGameSelectForm(FlaskForm):
 
         result = True
 
-        if self.game.data is None:
+        if not self.game.data:
             self.game.errors.append("Game must be selected first, or maybe play a game!")
             result = False
 
@@ -568,24 +568,26 @@ class DownloadJSON(FlaskForm):
      Attributes
      ----------
 
+     ndjson : BooleanField
+        Export each collection as newline delimited JSON (one document per line) instead of a JSON array.
+
      submitdownload : SubmitField
         Confirm Download.
      """
 
+    ndjson = BooleanField("One document per line (NDJSON)")
     submitdownload = SubmitField("Download DB archive")
 
 
 class UploadJSON(FlaskForm):
-    """ Form to upload JSON into the DB. Not implemented and likely validators will not work yet. Once implemented this
-    will drop the current database collections for the tenancy to upload the JSON data. Will not append existing data.
-
-    TO DO: Implement
+    """ Form to upload a CFFA export archive into the DB. This replaces the current payments, games, adjustments and
+    players for the tenancy with the archive data. Will not append existing data.
 
     Attributes
     ----------
 
     selectarchivefile : FileField
-        FlaskForm class type.
+        FlaskForm class type. Zip archive as downloaded from the Export DB tab.
 
     submitrecovery: SubmitField
         Confirm upload and reset of db.
@@ -593,7 +595,7 @@ class UploadJSON(FlaskForm):
     """
 
     selectarchivefile = FileField('CFFA Archive File', validators=[FileRequired(),
-                                                                   FileAllowed('cffaDB',
+                                                                   FileAllowed(['zip'],
                                                                                'CFFA DB exports only!')])
     submitrecovery = SubmitField("Reset and Recover DB")
 
@@ -776,20 +778,19 @@ def create_labels_for_games(games):
     Returns
     -------
 
-    :str:list
-        List of game labels
+    :tuple:list
+        consisting of the game's database ID as a string and the game label. The ID stays valid if other games are
+        added or removed whilst the form is open, unlike a list index.
 
     """
     # games is a list of dicts from DB not a game class
     game_labels = []
-    custom_id = 0
     for game in games:
         game_date = game.get("Date of Game dd-MON-YYYY")
         game_label = str(game_date.year) + "/" + str(game_date.month) + "/" + str(game_date.day) + \
                      "," + str(game.get("Players")) + " players, " + \
                      str(game.get("Cost of Game").to_decimal()) + " : " + game.get("PlayerList")
-        game_labels.append((custom_id, game_label))
-        custom_id += 1
+        game_labels.append((str(game.get("_id")), game_label))
 
     return game_labels
 
@@ -829,6 +830,48 @@ def create_labels_for_players(players, action):
     return player_labels
 
 
+class PlayerRoster:
+    """ The team's players with the labels for every player select form built in a single pass. Create one per
+    request (see server.player_roster) and share it between the forms of the request rather than calling
+    create_labels_for_players for each form.
+
+    Attributes
+    ----------
+
+    players : `list` of `dict`
+        Players from the TeamPlayers collection, as returned by get_all_players().
+
+    all_players : :tuple:list
+        Labels for every player, as create_labels_for_players(players, "allplayers")
+
+    retire : :tuple:list
+        Labels for active players, as create_labels_for_players(players, "retire")
+
+    reactivate : :tuple:list
+        Labels for retired players, as create_labels_for_players(players, "reactivate")
+
+    """
+
+    def __init__(self, players):
+        self.players = players
+        self.all_players = []
+        self.retire = []
+        self.reactivate = []
+        for custom_id, player in enumerate(players):
+            label = (custom_id, player.get("playerName"))
+            self.all_players.append(label)
+            if player.get("retiree", False):
+                self.reactivate.append(label)
+            else:
+                self.retire.append(label)
+
+    def name(self, custom_id):
+        """ Player name for a label ID, or None. """
+        if custom_id is None or not 0 <= custom_id < len(self.players):
+            return None
+        return self.players[custom_id].get("playerName")
+
+
 def delete_game_form(games):
     """ Unused function originally designed to specify the labels for delete game. C.
 
@@ -845,15 +888,7 @@ def delete_game_form(games):
         DeleteGame form.
 
      """
-    game_labels = []
-    custom_id = 0
-    for game in games:
-        game_date = game.get("Date of Game dd-MON-YYYY")
-        game_label = str(game_date.year) + "/" + str(game_date.month) + "/" + str(game_date.day) + \
-                     "," + str(game.get("Players")) + " players, " + \
-                     str(game.get("Cost of Game").to_decimal()) + " : " + game.get("PlayerList")
-        game_labels.append((custom_id, game_label))
-        custom_id += 1
+    game_labels = create_labels_for_games(games)
 
     form = DeleteGameSelectForm(obj=game_labels)
     form.game.choices = game_labels
@@ -0,0 +1,81 @@
+""" Jinja fragment caching for CFFA templates.
+
+Adds a {% cache name, key %} ... {% endcache %} tag. The rendered body is kept in memory under (key, name) and reused
+by later renders with the same key instead of rendering the body again. Routes pass a key made of the tenant and the
+build of the cached view the page is rendered from (see server.fragment_key), so a fragment is rendered once per view
+build and shared by every view of the page until the view is rebuilt. A key of None renders the body without caching.
+
+Example:
+
+{% cache "allplayers", fragmentKey %}
+    <table> ... </table>
+{% endcache %}
+
+Views are rebuilt when the team's data changes and when they reach their max_age (some tables, eg: recent games,
+depend on the date as well as the data), so a fragment is never older than its view. The ttl only frees the memory of
+fragments whose view has been rebuilt.
+
+"""
+
+import threading
+from cachetools import TTLCache
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+
+class FragmentCache:
+    """ Thread safe store of rendered template fragments.
+
+    Attributes
+    ----------
+
+    maxsize : int
+        Maximum number of fragments held before the least recently used is evicted.
+
+    ttl : int
+        Seconds a fragment is reused for.
+
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._fragments = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        """ The fragment stored under key, rendered with render() and stored if there is none. """
+        with self._lock:
+            fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = render()
+            with self._lock:
+                self._fragments[key] = fragment
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+
+class FragmentCacheExtension(Extension):
+    """ Jinja extension providing the cache tag. The store is environment.fragment_cache, which can be replaced to
+    change its size or ttl. """
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        Extension.__init__(self, environment)
+        environment.extend(fragment_cache=FragmentCache())
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        parser.stream.expect("comma")
+        args.append(parser.parse_expression())
+        body = parser.parse_statements(["name:endcache"], drop_needle=True)
+        return nodes.CallBlock(self.call_method("_render_cached", args), [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, name, key, caller):
+        if key is None:
+            return caller()
+        return self.environment.fragment_cache.get_or_render((key, name), caller)
@@ -0,0 +1,84 @@
+""" Per tenant index of game labels for the typeahead game pickers on the manage games page.
+
+The edit and delete game pickers used to be select lists holding a label for every game the team has ever played,
+built on every render and sent twice in each page. The labels are now built once per tenant data version into a
+GameLabelIndex (cached with dashboard.TenantViewCache) and the pickers query it a few results at a time through a
+search endpoint as the manager types.
+
+"""
+
+import formHandler
+import paging
+
+SEARCH_LIMIT = 20
+
+
+class GameLabelIndex:
+    """ Searchable game labels of one tenant, newest game first. Read only, shared between requests.
+
+    Attributes
+    ----------
+
+    labels : :tuple:list
+        (game ID, label) as created by formHandler.create_labels_for_games, newest game first.
+
+    """
+
+    def __init__(self, games):
+        """ Build the index.
+
+        Parameters
+        ----------
+
+        games : `list` of `dict`
+            Game documents, newest first.
+
+        """
+        self.labels = formHandler.create_labels_for_games(games)
+        self._by_id = dict(self.labels)
+        self._keys = []
+        for game in games:
+            game_date = game.get(paging.GAME_DATE_KEY)
+            dates = (paging.format_date(game_date), game_date.strftime("%Y/%m/%d"), game_date.strftime("%Y-%m-%d"))
+            players = [name.strip().lower() for name in str(game.get("PlayerList", "")).split(",")]
+            self._keys.append((dates, players))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, game_id):
+        return game_id in self._by_id
+
+    def label(self, game_id):
+        """ Label of a game, or None if the game is not in the index. """
+        return self._by_id.get(game_id)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """ Games whose date starts with query (yyyy/m/d, yyyy/mm/dd or yyyy-mm-dd) or with a player whose name
+        starts with query (case insensitive), newest first.
+
+        Parameters
+        ----------
+
+        query : str
+            Text typed into the picker. An empty query returns the most recent games.
+
+        limit : int
+            Maximum number of results.
+
+        Returns
+        -------
+
+        :tuple:list
+            (game ID, label)
+        """
+        query = (query or "").strip().lower()
+        results = []
+        for (dates, players), label in zip(self._keys, self.labels):
+            if not query or any(date.startswith(query) for date in dates) or \
+                    any(name.startswith(query) for name in players):
+                results.append(label)
+                if len(results) >= limit:
+                    break
+
+        return results
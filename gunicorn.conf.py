@@ -0,0 +1,35 @@
+""" gunicorn settings for CFFA, read by gunicorn from the working directory (boot.sh runs gunicorn from the CFFA
+directory). Settings given on the gunicorn command line, such as -w 1, override these.
+
+Start CFFA with the app factory, preloaded so that the workers share the compiled templates:
+
+gunicorn --preload 'server:create_app()'
+
+Each worker opens its own DB clients after the fork, in post_fork below.
+
+CFFA is served by threaded (gthread) workers rather than the default sync worker, which handles one request at a time.
+Each worker thread serves one request, so one process holds many slow clients (eg: players on phones) while requests
+wait on MongoDB, and concurrentReads fans a page's reads out over its own pool. CFFA keeps all shared state (tenancy,
+dashboard and fragment caches) in thread safe caches, and per request state in flask g.
+
+Environment variables:
+
+GUNICORN_WORKERS - processes, default 2
+GUNICORN_THREADS - threads per process, default 32
+GUNICORN_WORKER_CLASS - default gthread; sync restores the previous one request per process behaviour
+
+"""
+
+import os
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+# keep connections from browsers open between page and asset requests
+keepalive = 5
+
+
+def post_fork(server, worker):
+    """ Open CFFA's DB clients and thread pools in each worker once it has been forked (see server.init_backend). """
+    import server as cffa
+    cffa.init_backend()
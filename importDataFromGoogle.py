@@ -101,7 +101,7 @@ class GoogleImporter:
         self.summary_row_start = summary_row_start
         self.summary_row_end = summary_row_end
 
-    def download_data(self):
+    def download_data(self, progress=None):
         """ Calls a series of methods on both the googleImport and footballDB objects to obtain and populate data. Note
         that the logic reads each worksheet in full and populates documents/collections accordingly.
 
@@ -110,6 +110,12 @@ class GoogleImporter:
 
         TO DO: error handling!
 
+        Parameters
+        ----------
+
+        progress : callable
+            Optional progress(percent, message) called as each stage starts, eg: jobs.Job.progress
+
         Returns
         -------
 
@@ -118,6 +124,10 @@ class GoogleImporter:
 
         """
 
+        if progress is None:
+            progress = _no_progress
+
+        progress(5, "Reading google sheet " + self.gsheet_name)
         google = googleImport.Googlesheet(self.key_filename,
                                           self.gsheet_name,
                                           self.transactions_worksheet,
@@ -127,13 +137,17 @@ class GoogleImporter:
         main_players = google.derive_players(self.summary_row_start,
                                              self.summary_row_end)
 
+        progress(40, "Populating payments, games and adjustments")
         self.db.populate_payments(google.transactions)
         google.calc_player_list_per_game()
         self.db.populate_games(google.all_games)
         adjustments = google.calc_player_adjustments(self.summary_row_start, self.summary_row_end)
         self.db.populate_adjustments(adjustments)
+
+        progress(70, "Calculating team summary")
         self.db.calc_populate_team_summary(main_players)
 
+        progress(85, "Checking player retirements")
         player_detalls = []
         for player in main_players:
             player_dict = dict(playerName=player,
@@ -143,3 +157,7 @@ class GoogleImporter:
         self.db.populate_team_players(player_detalls)
 
         return "Imported data from google sheet:" + self.gsheet_name
+
+
+def _no_progress(percent, message):
+    pass
@@ -1,17 +1,37 @@
 """ Library to handle export and import of DB data in JSOn format.
 
-Currently only implemented Export functionality
+exportarchive builds a zip file in the export directory, whilst exportstream generates the same archive in chunks
+straight from the DB reads so that a web server can stream it to the client without touching disk.
 
-TO DO: Destructive import
+importarchive is the destructive import (restore) of an export archive. Each collection in the archive is parsed as a
+stream and bulk inserted in batches into a staging collection. Only once the whole archive has been staged are the
+team's collections replaced, so a truncated or corrupt archive never changes the team's data. cffadb replaces the
+collections one by one, so the team's current data is staged as well before the swap and put back if the swap fails
+part way.
 
 """
 
+import io
+import os
+import json
 import shutil
+import zipfile
+from uuid import uuid4
 from cffadb import dbinterface
+from bson import json_util
 from bson.json_util import dumps
 from datetime import datetime
 import logging
 
+RESTORE_BATCH_SIZE = 1000
+RESTORE_READ_SIZE = 65536
+# largest document accepted in an archive, the MongoDB document size limit
+RESTORE_MAX_DOCUMENT = 16 * 1024 * 1024
+# collections that must be present in an archive for it to be restored
+RESTORE_COLLECTIONS = ("payments", "games", "adjustments", "teamPlayers")
+# number of collections yielded by CFFAImportExport.exportcollections, for export progress
+EXPORT_COLLECTIONS = 6
+
 # logging config
 logger = logging.getLogger("cffaImportExport")
 logger.setLevel(logging.DEBUG)
@@ -97,3 +117,392 @@ class CFFAImportExport:
 
         archive_export_file = archive_export_file + ".zip"
         return archive_export_file
+
+    def exportcollections(self):
+        """ The collections included in an export, read one at a time as the generator is advanced so that only one
+        collection is held in memory.
+
+        Returns
+        -------
+
+            :generator
+            (collection name, list of documents) tuples
+        """
+        yield "payments", self.db_connection.get_all_transactions()
+        yield "games", self.db_connection.get_all_games()
+        yield "adjustments", self.db_connection.get_all_adjustments()
+        yield "teamSummary", self.db_connection.get_full_summary()
+        yield "teamPlayers", self.db_connection.get_team_players()
+        yield "teamSettings", self.db_connection.get_team_settings()
+
+    def exportfilename(self):
+        """ Download name for an export archive, matching the name used by exportarchive. """
+        ctime = datetime.now()
+        return "cffa_export" + str(ctime.day) + "-" + str(ctime.month) + "-" + str(ctime.year) + ".zip"
+
+    def exportstream(self, ndjson=False, progress=None):
+        """ Generate the export zip archive in chunks. Nothing is written to disk and memory use is bounded by the
+        largest collection rather than by the archive. Each collection is written as <collection>.json holding a JSON
+        array, or as <collection>.ndjson holding one JSON document per line.
+
+        Parameters
+        ----------
+
+        ndjson : bool
+            Write collections as newline delimited JSON instead of JSON arrays.
+
+        progress : callable
+            Optional progress(percent, message) called as each collection is started, eg: jobs.Job.progress
+
+        Returns
+        -------
+
+            :generator
+            bytes chunks of the zip archive, for use as a streamed web response.
+        """
+        return (chunk for chunk in self._exportchunks(ndjson, progress) if chunk)
+
+    def _exportchunks(self, ndjson, progress):
+        """ Writes the archive, yielding whatever zipfile has flushed after each document. Most yields are empty as
+        the compressor buffers, exportstream filters them out. """
+        sink = _StreamSink()
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for index, (collection_name, documents) in enumerate(self.exportcollections()):
+                member_name = collection_name + (".ndjson" if ndjson else ".json")
+                logger.info("Exporting " + member_name)
+                if progress is not None:
+                    progress(100 * index // EXPORT_COLLECTIONS, "Exporting " + collection_name)
+                # size is unknown up front so zip64 headers are forced
+                with archive.open(member_name, 'w', force_zip64=True) as member:
+                    if not ndjson:
+                        member.write(b'[')
+                    i = 0
+                    for document in documents:
+                        document["_id"] = i
+                        if ndjson:
+                            member.write(dumps(document).encode("utf-8") + b'\n')
+                        else:
+                            member.write((b',' if i > 0 else b'') + dumps(document).encode("utf-8"))
+                        i += 1
+                        yield sink.drain()
+                    if not ndjson:
+                        member.write(b']')
+                yield sink.drain()
+                logger.info("Exported " + collection_name)
+
+        # closing the archive writes the central directory
+        yield sink.drain()
+
+    def importarchive(self, archive_file, staging_database):
+        """ Restore the team's data from an archive produced by exportarchive or exportstream, replacing the current
+        payments, games, adjustments and players. The team summary is recalculated from the restored data rather than
+        restored, and team settings (team name) are left as they are.
+
+        Parameters
+        ----------
+
+        archive_file : file object
+            Seekable binary file object of the zip archive, for example the uploaded file stream.
+
+        staging_database : pymongo.database.Database
+            Database in which temporary staging collections are created. They are dropped before returning.
+
+        Returns
+        -------
+
+            :str
+            Message for CFFA to banner to the end user.
+
+        Raises
+        ------
+
+        zipfile.BadZipFile
+            If the upload is not a zip archive.
+
+        ValueError
+            If the archive is missing a collection or a collection cannot be parsed.
+
+        """
+        token = uuid4().hex
+        staged = {}
+        try:
+            with zipfile.ZipFile(archive_file) as archive:
+                for member_info in archive.infolist():
+                    collection_name, extension = os.path.splitext(os.path.basename(member_info.filename))
+                    if collection_name not in RESTORE_COLLECTIONS or extension not in (".json", ".ndjson"):
+                        logger.info("Restore skipping archive member " + member_info.filename)
+                        continue
+
+                    staging = staging_database["restore_" + token + "_" + collection_name]
+                    staged[collection_name] = staging
+                    with archive.open(member_info) as member:
+                        text = io.TextIOWrapper(member, encoding="utf-8")
+                        documents = iter_ndjson(text) if extension == ".ndjson" else iter_json_array(text)
+                        count = _insert_batches(staging, documents)
+                    logger.info("Staged " + str(count) + " documents from " + member_info.filename)
+
+            missing = [name for name in RESTORE_COLLECTIONS if name not in staged]
+            if missing:
+                raise ValueError("Archive is missing collections: " + ", ".join(missing))
+
+            self._swapin(staged, staging_database, token)
+        finally:
+            for staging in staged.values():
+                staging.drop()
+
+        return "Restored team data from archive"
+
+    def restorecollections(self):
+        """ The team's current data in the collections replaced by a restore, read one at a time.
+
+        Returns
+        -------
+
+            :generator
+            (collection name, list of documents) tuples
+        """
+        yield "payments", self.db_connection.get_all_transactions()
+        yield "games", self.db_connection.get_all_games()
+        yield "adjustments", self.db_connection.get_all_adjustments()
+        yield "teamPlayers", self.db_connection.get_team_players()
+
+    def _swapin(self, staged, staging_database, token):
+        """ Replace the team's collections with the staged documents. cffadb replaces them one at a time with no
+        transaction, so the current data is staged first and repopulated if any step fails.
+
+        Raises
+        ------
+
+        ValueError
+            If the swap failed and the previous data was put back.
+
+        """
+        previous = {}
+        try:
+            for collection_name, documents in self.restorecollections():
+                previous[collection_name] = staging_database["restore_" + token + "_previous_" + collection_name]
+                _insert_batches(previous[collection_name], documents)
+
+            try:
+                self._populate(staged)
+            except Exception as e:
+                logger.exception("Restore failed part way, putting back the previous team data")
+                try:
+                    self._populate(previous)
+                except Exception:
+                    logger.critical("Could not put back the previous team data, the team is partially restored")
+                    raise e
+                raise ValueError("the restore failed part way and the previous data was put back (" +
+                                 getattr(e, 'message', repr(e)) + ")") from e
+        finally:
+            for staging in previous.values():
+                staging.drop()
+
+    def _populate(self, collections):
+        """ Replace the team's collections with the documents of staging collections, using the same replace logic as
+        the google sheet import, then recalculate the team summary. cffadb's populate calls take lists, so each
+        collection is read into memory in turn. """
+        self.db_connection.populate_payments(list(collections["payments"].find({}, {"_id": 0})))
+        self.db_connection.populate_games(list(collections["games"].find({}, {"_id": 0})))
+        self.db_connection.populate_adjustments(list(collections["adjustments"].find({}, {"_id": 0})))
+        team_players = list(collections["teamPlayers"].find({}, {"_id": 0}))
+        self.db_connection.calc_populate_team_summary([player.get("playerName") for player in team_players])
+        self.db_connection.populate_team_players(team_players)
+
+
+def _insert_batches(collection, documents):
+    """ Bulk insert documents into collection RESTORE_BATCH_SIZE at a time. Export _ids are sequence numbers, not
+    DB ids, so they are dropped. Returns the number of documents inserted. """
+    batch = []
+    count = 0
+    for document in documents:
+        document.pop("_id", None)
+        batch.append(document)
+        if len(batch) == RESTORE_BATCH_SIZE:
+            collection.insert_many(batch, ordered=False)
+            count += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        count += len(batch)
+
+    return count
+
+
+def _decoder():
+    """ JSON decoder that converts MongoDB extended JSON ($date, $numberDecimal...) back to bson types. """
+    return json.JSONDecoder(object_hook=json_util.object_hook)
+
+
+def _document(value, number):
+    """ Check a parsed collection item is a document. """
+    if not isinstance(value, dict):
+        raise ValueError("Item " + str(number) + " of the collection is not a document")
+    return value
+
+
+def iter_ndjson(text):
+    """ Parse newline delimited JSON one line at a time.
+
+    Parameters
+    ----------
+
+    text : text file object
+
+    Returns
+    -------
+
+        :generator
+        dict per document
+
+    Raises
+    ------
+
+    ValueError
+        If a line is not a JSON object or is longer than RESTORE_MAX_DOCUMENT.
+    """
+    decoder = _decoder()
+    line_number = 0
+    while True:
+        line = text.readline(RESTORE_MAX_DOCUMENT + 1)
+        if line == "":
+            return
+        line_number += 1
+        if len(line) > RESTORE_MAX_DOCUMENT:
+            raise ValueError("Line " + str(line_number) + " is longer than the largest document allowed")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            document = decoder.decode(line)
+        except ValueError as e:
+            raise ValueError("Invalid document on line " + str(line_number) + ": " + str(e)) from e
+        yield _document(document, line_number)
+
+
+def iter_json_array(text):
+    """ Parse a JSON array of documents incrementally, reading RESTORE_READ_SIZE characters at a time so the array is
+    never held in memory. A trailing comma before the closing bracket (written by earlier exportarchive versions) is
+    accepted.
+
+    Parameters
+    ----------
+
+    text : text file object
+
+    Returns
+    -------
+
+        :generator
+        dict per document
+
+    Raises
+    ------
+
+    ValueError
+        If the collection is not a JSON array of objects, has anything but whitespace after the array, or holds a
+        document longer than RESTORE_MAX_DOCUMENT.
+    """
+    decoder = _decoder()
+    reader = _ArrayReader(text)
+
+    if reader.next_char() != "[":
+        raise ValueError("Collection is not a JSON array")
+    reader.position += 1
+    number = 0
+    expect_item = True
+    while True:
+        char = reader.next_char()
+        if char == "":
+            raise ValueError("Collection array is not terminated")
+        if char == "]":
+            # a trailing comma (expect_item after a separator) is accepted
+            break
+        if char == ",":
+            if expect_item:
+                raise ValueError("Missing document before a comma after item " + str(number))
+            reader.position += 1
+            expect_item = True
+            continue
+        if not expect_item:
+            raise ValueError("Missing comma after item " + str(number))
+
+        number += 1
+        yield _document(reader.decode(decoder, number), number)
+        expect_item = False
+
+    reader.position += 1
+    if reader.next_char() != "":
+        raise ValueError("Unexpected data after the collection array")
+
+
+class _ArrayReader:
+    """ Buffered reader over a text file for iter_json_array. """
+
+    def __init__(self, text):
+        self.text = text
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def _read(self):
+        """ Append the next RESTORE_READ_SIZE characters to the unread part of the buffer. """
+        more = self.text.read(RESTORE_READ_SIZE)
+        self.eof = more == ""
+        self.buffer = self.buffer[self.position:] + more
+        self.position = 0
+
+    def next_char(self):
+        """ The next character that is not whitespace, left unread, or "" at the end of the file. """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in " \t\r\n":
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                return ""
+            self._read()
+
+    def decode(self, decoder, number):
+        """ Decode the JSON value at the current position, reading more whilst it straddles the end of the buffer. """
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.position)
+                # a number may run on into the next read
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except ValueError as e:
+                if self.eof:
+                    raise ValueError("Invalid document at item " + str(number) + ": " + str(e)) from e
+            if len(self.buffer) - self.position > RESTORE_MAX_DOCUMENT:
+                raise ValueError("Item " + str(number) + " is longer than the largest document allowed")
+            self._read()
+
+
+class _StreamSink(io.RawIOBase):
+    """ Write only, unseekable file object that zipfile writes the archive into. Written bytes are held until the
+    export generator drains them into the response, so at most a few compressed blocks are buffered.
+    """
+
+    def __init__(self):
+        io.RawIOBase.__init__(self)
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        """ Remove and return everything written since the last drain. """
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
@@ -0,0 +1,277 @@
+""" In process background jobs for long running CFFA operations (google import, export, delete all data).
+
+Long operations used to run inline in the request thread, blocking the worker for every other user. They are now
+submitted to a bounded thread pool and the request returns straight away with a job ID. Each job has a record in the
+jobs collection holding its status (queued, running, done or failed), percentage progress and a message, which the
+settings page polls. Job output, such as an export archive, is stored in GridFS so it can be downloaded from any
+worker or pod once the job has finished.
+
+Jobs run in the worker process that accepted them. If that process exits, its queued and running jobs are not resumed.
+Each process stamps a heartbeat on its active jobs every HEARTBEAT_INTERVAL seconds, and an active job whose heartbeat
+is older than STALE_AFTER is failed as orphaned (on start up of a runner, and before a job is submitted) so that it
+does not block the tenant from running the same kind of job again.
+
+A tenant has at most one active (queued or running) job of each kind. The jobs flagged active carry a unique partial
+index on tenant and kind, so two submits racing each other (eg: a double click) cannot both start a job.
+
+"""
+
+import socket
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import DuplicateKeyError
+import gridfs
+import logging
+
+# logging config
+logger = logging.getLogger("cffa_jobs")
+logger.setLevel(logging.DEBUG)
+# console handler
+ch = logging.StreamHandler()
+ch.setLevel(logging.DEBUG)
+formatting = logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+ch.setFormatter(formatting)
+logger.addHandler(ch)
+
+JOB_COLLECTION = "jobs"
+JOB_RESULTS = "jobResults"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+GOOGLE_IMPORT = "googleImport"
+EXPORT = "export"
+DELETE_ALL = "deleteAll"
+
+# seconds between heartbeats of a process's active jobs, and the heartbeat age after which a job is orphaned
+HEARTBEAT_INTERVAL = 30
+STALE_AFTER = 120
+
+JOB_NAMES = {GOOGLE_IMPORT: "Google sheet import",
+             EXPORT: "Export DB",
+             DELETE_ALL: "Delete all data"}
+
+
+class Job:
+    """ Handle passed to a job function so it can report progress and store its output.
+
+    Attributes
+    ----------
+
+    job_id : str
+        ID of the job record.
+
+    """
+
+    def __init__(self, runner, job_id):
+        self.runner = runner
+        self.job_id = job_id
+
+    def progress(self, percent, message=None):
+        """ Record job progress.
+
+        Parameters
+        ----------
+
+        percent : int
+            0 to 100
+
+        message : str
+            Optional description of the current step.
+
+        """
+        fields = {"progress": int(percent)}
+        if message is not None:
+            fields["message"] = message
+        self.runner.update(self.job_id, **fields)
+
+    def store_result(self, chunks, filename, content_type):
+        """ Store the job output in GridFS, written chunk by chunk so it is never held in memory.
+
+        Parameters
+        ----------
+
+        chunks : iterable of bytes
+            Output of the job, for example CFFAImportExport.exportstream()
+
+        filename : str
+            Name the output is downloaded as.
+
+        content_type : str
+            Mime type of the output.
+
+        """
+        with self.runner.results.new_file(filename=filename, contentType=content_type,
+                                          metadata={"job_id": self.job_id}) as result_file:
+            for chunk in chunks:
+                result_file.write(chunk)
+
+        self.runner.update(self.job_id, result_file=result_file._id)
+
+
+class JobRunner:
+    """ Bounded pool of worker threads running jobs, with the job records held in MongoDB.
+
+    Attributes
+    ----------
+
+    collection : pymongo.collection.Collection
+        Job records.
+
+    results : gridfs.GridFS
+        Job output files.
+
+    max_workers : int
+        Maximum number of jobs running at once in this process. Further jobs wait as queued.
+
+    """
+
+    def __init__(self, database, max_workers=2):
+        """ Initialise against the CFFA database.
+
+        Parameters
+        ----------
+
+        database : pymongo.database.Database
+            CFFA mongoDB database.
+
+        max_workers : int
+            Size of the worker pool.
+
+        """
+        self.collection = database[JOB_COLLECTION]
+        self.results = gridfs.GridFS(database, collection=JOB_RESULTS)
+        self.max_workers = max_workers
+        self.owner = socket.gethostname() + ":" + str(os.getpid())
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cffa-job")
+        self.collection.create_index([("tenant_id", 1), ("kind", 1)], name="one_active_job", unique=True,
+                                     partialFilterExpression={"active": True})
+        self.reap_orphans()
+        self._heartbeat = threading.Thread(target=self._beat, name="cffa-job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def submit(self, tenant_id, user_id, kind, func):
+        """ Queue a job. If the tenant already has a job of the same kind queued or running, that job is returned
+        instead of starting another one (eg: a double clicked delete).
+
+        Parameters
+        ----------
+
+        tenant_id : str
+            Tenancy the job works on.
+
+        user_id : str
+            Auth0 user ID of the user who started the job.
+
+        kind : str
+            One of GOOGLE_IMPORT, EXPORT, DELETE_ALL
+
+        func : callable
+            func(job) does the work and returns a message for the user. Raising an exception fails the job.
+
+        Returns
+        -------
+
+        :str
+            job ID
+        """
+        self.reap_orphans()
+        job_id = uuid4().hex
+        now = datetime.utcnow()
+        try:
+            self.collection.insert_one({"_id": job_id,
+                                        "tenant_id": tenant_id,
+                                        "user_id": user_id,
+                                        "kind": kind,
+                                        "status": QUEUED,
+                                        "active": True,
+                                        "progress": 0,
+                                        "message": "Queued",
+                                        "owner": self.owner,
+                                        "heartbeat": now,
+                                        "created": now,
+                                        "updated": now})
+        except DuplicateKeyError:
+            active = self.collection.find_one({"tenant_id": tenant_id, "kind": kind, "active": True})
+            if active is None:
+                # the active job finished in the meantime
+                return self.submit(tenant_id, user_id, kind, func)
+            return active.get("_id")
+
+        self._pool.submit(self._run, job_id, func)
+        logger.info("Queued " + kind + " job " + job_id + " for tenant " + str(tenant_id))
+        return job_id
+
+    def update(self, job_id, **fields):
+        """ Update fields of a job record. """
+        fields["updated"] = datetime.utcnow()
+        self.collection.update_one({"_id": job_id}, {"$set": fields})
+
+    def reap_orphans(self):
+        """ Fail active jobs whose process has stopped heartbeating, eg: a worker restarted or crashed mid job. """
+        stale = datetime.utcnow() - timedelta(seconds=STALE_AFTER)
+        result = self.collection.update_many({"active": True, "heartbeat": {"$lt": stale}},
+                                             {"$set": {"status": FAILED,
+                                                       "message": "Stopped when the server restarted, please retry",
+                                                       "updated": datetime.utcnow()},
+                                              "$unset": {"active": ""}})
+        if result.modified_count:
+            logger.warning("Failed " + str(result.modified_count) + " orphaned job(s)")
+
+    def get(self, job_id):
+        """ Job record by ID, or None. """
+        return self.collection.find_one({"_id": job_id})
+
+    def recent(self, tenant_id, limit=5):
+        """ Most recent job records of a tenant, newest first. """
+        return list(self.collection.find({"tenant_id": tenant_id}).sort("created", -1).limit(limit))
+
+    def open_result(self, job):
+        """ GridFS file holding the output of a finished job, or None if the job has no output. """
+        if job.get("result_file") is None:
+            return None
+        try:
+            return self.results.get(job.get("result_file"))
+        except gridfs.errors.NoFile:
+            return None
+
+    def purge_results(self, tenant_id, kind, keep_job_id):
+        """ Delete the stored output of a tenant's earlier jobs of one kind, keeping keep_job_id. """
+        for job in self.collection.find({"tenant_id": tenant_id, "kind": kind, "_id": {"$ne": keep_job_id},
+                                         "result_file": {"$exists": True}}):
+            self.results.delete(job.get("result_file"))
+            self.collection.update_one({"_id": job.get("_id")}, {"$unset": {"result_file": ""}})
+
+    def _finish(self, job_id, **fields):
+        """ Record the outcome of a job and release its tenant and kind for the next job. """
+        fields["updated"] = datetime.utcnow()
+        self.collection.update_one({"_id": job_id}, {"$set": fields, "$unset": {"active": ""}})
+
+    def _beat(self):
+        """ Heartbeat thread body: stamps the active jobs of this process so other processes see they are alive. """
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            try:
+                self.collection.update_many({"owner": self.owner, "active": True},
+                                            {"$set": {"heartbeat": datetime.utcnow()}})
+            except Exception as e:
+                logger.error("Job heartbeat failed: " + getattr(e, 'message', repr(e)))
+
+    def _run(self, job_id, func):
+        """ Worker thread body: runs the job function and records the outcome. """
+        self.update(job_id, status=RUNNING, message="Running", started=datetime.utcnow())
+        try:
+            message = func(Job(self, job_id))
+        except Exception as e:
+            logger.exception("Job " + job_id + " failed")
+            self._finish(job_id, status=FAILED, message=getattr(e, 'message', repr(e)))
+            return
+
+        self._finish(job_id, status=DONE, progress=100, message=message)
+        logger.info("Job " + job_id + " done: " + str(message))
@@ -0,0 +1,126 @@
+""" MongoDB connection strings for CFFA, with connection pool settings and replica set read routing.
+
+BACKEND_DBHOST may list several hosts, comma separated, such as the three members of the replica set in the Google
+Cloud tutorial (mongod-0..2). CFFA connects twice:
+
+- a primary connection for writes and anything that must see the latest data,
+- a read connection with a secondaryPreferred read preference (BACKEND_READ_PREFERENCE), used by the read only pages
+  (dashboards, player summary, exports) so their read load is spread over the secondaries.
+
+Secondaries can lag the primary. To keep read-your-writes after a manager changes a team's data, the read connection
+is bounded with maxStalenessSeconds (BACKEND_MAX_STALENESS_SECONDS) and a tenant's reads go to the primary for
+READ_YOUR_WRITES_WINDOW seconds after each change, as recorded by dataVersion.TenantDataVersions. The window must be
+longer than the maximum staleness. cffadb does not take client sessions, so causal consistency is given by this
+routing rather than by causally consistent sessions.
+
+Pool and timeout settings apply to both connections, see POOL_OPTIONS.
+
+"""
+
+from urllib.parse import quote_plus, urlencode
+import constants
+
+# environment variable -> MongoDB connection string option
+POOL_OPTIONS = {
+    constants.BACKEND_REPLICASET: "replicaSet",
+    constants.BACKEND_MAX_POOL_SIZE: "maxPoolSize",
+    constants.BACKEND_MIN_POOL_SIZE: "minPoolSize",
+    constants.BACKEND_MAX_IDLE_TIME_MS: "maxIdleTimeMS",
+    constants.BACKEND_WAIT_QUEUE_TIMEOUT_MS: "waitQueueTimeoutMS",
+    constants.BACKEND_CONNECT_TIMEOUT_MS: "connectTimeoutMS",
+    constants.BACKEND_SOCKET_TIMEOUT_MS: "socketTimeoutMS",
+    constants.BACKEND_SERVER_SELECTION_TIMEOUT_MS: "serverSelectionTimeoutMS"
+}
+
+# defaults for options not set in the environment. The pymongo defaults wait 30 seconds for a server and forever for
+# a pooled connection, which ties up a worker thread for as long when the DB is unreachable or the pool is exhausted.
+DEFAULT_POOL_OPTIONS = {
+    "maxPoolSize": "100",
+    "serverSelectionTimeoutMS": "5000",
+    "waitQueueTimeoutMS": "5000",
+    "connectTimeoutMS": "5000"
+}
+
+DEFAULT_READ_PREFERENCE = "secondaryPreferred"
+# the lowest maxStalenessSeconds MongoDB accepts
+DEFAULT_MAX_STALENESS_SECONDS = 90
+
+
+def connection_string(user, password, hosts, port, dbname, options=None):
+    """ MongoDB connection string for CFFA.
+
+    Parameters
+    ----------
+
+    user : str
+        BACKEND_DBUSR, quoted as needed.
+
+    password : str
+        BACKEND_DBPWD, quoted as needed.
+
+    hosts : str
+        BACKEND_DBHOST, one host or several comma separated. Hosts without a port are given port.
+
+    port : str
+        BACKEND_DBPORT
+
+    dbname : str
+        BACKEND_DBNAME, also the authentication database.
+
+    options : dict
+        Connection string options, eg: {"maxPoolSize": "50"}
+
+    Returns
+    -------
+
+    :str
+    """
+    host_list = ",".join(host.strip() if ":" in host else host.strip() + ":" + str(port)
+                         for host in hosts.split(",") if host.strip())
+    uri = "mongodb://" + quote_plus(user) + ":" + quote_plus(password) + "@" + host_list + "/" + dbname
+    if options:
+        uri += "?" + urlencode(sorted(options.items()))
+    return uri
+
+
+def pool_options(environment):
+    """ Connection pool and timeout options from the environment, with DEFAULT_POOL_OPTIONS for any not set.
+
+    Parameters
+    ----------
+
+    environment : dict
+        os.environ
+
+    Returns
+    -------
+
+    :dict
+    """
+    options = dict(DEFAULT_POOL_OPTIONS)
+    for variable, option in POOL_OPTIONS.items():
+        if environment.get(variable):
+            options[option] = environment.get(variable)
+    return options
+
+
+def read_options(environment):
+    """ pool_options plus the read preference and staleness bound of the read connection.
+
+    Parameters
+    ----------
+
+    environment : dict
+        os.environ
+
+    Returns
+    -------
+
+    :dict
+    """
+    options = pool_options(environment)
+    options["readPreference"] = environment.get(constants.BACKEND_READ_PREFERENCE, DEFAULT_READ_PREFERENCE)
+    if options["readPreference"] != "primary":
+        options["maxStalenessSeconds"] = str(environment.get(constants.BACKEND_MAX_STALENESS_SECONDS,
+                                                             DEFAULT_MAX_STALENESS_SECONDS))
+    return options
@@ -0,0 +1,133 @@
+""" Keyset pagination for CFFA listings (games and transactions).
+
+Listings are ordered newest first on (date, _id). A page is addressed by an opaque cursor encoding the (date, _id) key
+of the last row of the previous page, so pages stay stable while games and transactions are added, unlike offset
+paging.
+
+cffadb returns whole collections as lists, so the keyset is applied to a sorted list that is cached per tenant data
+version (see dashboard.TenantViewCache). Paging through a listing therefore costs no further DB reads.
+
+"""
+
+import base64
+from bisect import bisect_left
+from datetime import datetime, date
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+GAME_DATE_KEY = "Date of Game dd-MON-YYYY"
+TRANSACTION_DATE_KEY = "Date"
+
+
+class KeysetList:
+    """ A listing sorted on (date, _id) that can be read a page at a time.
+
+    Attributes
+    ----------
+
+    documents : `list` of `dict`
+        Documents sorted oldest first. Read only, shared between requests.
+
+    date_key : str
+        Document key holding the date used for ordering.
+
+    rows : list
+        view(document) for each document, in the same order, when a view is given. Pages return these rows instead
+        of the documents, so that a view model (eg: viewModels.GameRow) is built once per listing not once per page.
+
+    """
+
+    def __init__(self, documents, date_key, view=None):
+        self.date_key = date_key
+        keyed = sorted(((_document_key(document, date_key), document) for document in documents),
+                       key=lambda item: item[0])
+        self._keys = [item[0] for item in keyed]
+        self.documents = [item[1] for item in keyed]
+        self.rows = self.documents if view is None else [view(document) for document in self.documents]
+
+    def __len__(self):
+        return len(self.documents)
+
+    def page(self, after=None, limit=PAGE_SIZE):
+        """ One page of the listing, newest first.
+
+        Parameters
+        ----------
+
+        after : str
+            Cursor returned with the previous page, or None for the first page.
+
+        limit : int
+            Maximum rows in the page.
+
+        Returns
+        -------
+
+        :tuple
+            (list of rows, cursor for the next page or None if this is the last page)
+
+        Raises
+        ------
+
+        ValueError
+            If the cursor cannot be decoded.
+
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        end = len(self._keys) if after is None else bisect_left(self._keys, decode_cursor(after))
+        start = max(0, end - limit)
+        rows = self.rows[start:end]
+        rows.reverse()
+
+        next_cursor = encode_cursor(self._keys[start]) if start > 0 else None
+        return rows, next_cursor
+
+
+def _as_datetime(value):
+    """ Normalise dates so that every key is comparable. """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.min
+
+
+def _document_key(document, date_key):
+    return _as_datetime(document.get(date_key)), str(document.get("_id", ""))
+
+
+def encode_cursor(key):
+    """ Encode a (datetime, id) key as a URL safe cursor. """
+    raw = key[0].isoformat() + "|" + key[1]
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """ Decode a cursor produced by encode_cursor back to a (datetime, id) key.
+
+    Raises
+    ------
+
+    ValueError
+        If the cursor is malformed.
+
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        date_part, id_part = raw.split("|", 1)
+        return datetime.fromisoformat(date_part), id_part
+    except (UnicodeError, TypeError, ValueError) as e:
+        raise ValueError("Invalid page cursor: " + str(cursor)) from e
+
+
+def format_date(value, separator="/"):
+    """ Date format used by the CFFA tables (yyyy/m/d). Missing dates are shown blank. """
+    if value is None:
+        return ""
+    return str(value.year) + separator + str(value.month) + separator + str(value.day)
+
+
+def format_money(value):
+    """ Money format used by the CFFA tables for Decimal128 amounts. """
+    return "£" + str(round(value.to_decimal(), 2))
@@ -0,0 +1,131 @@
+""" Opt-in profiling of single CFFA requests, for finding where the time of a slow page goes.
+
+Profiling is off unless PROFILE_DIRECTORY is set. When it is not set, server.py does not register the profiling
+hooks at all, so requests pay nothing for them. When it is set, a manager can profile one request by adding
+?profile=1 to the page URL, or by sending the X-CFFA-Profile: 1 header. Requests from players, or from anyone not
+logged in, are never profiled.
+
+The request, including the rendering of streamed pages, is run under cProfile and two reports are saved to
+PROFILE_DIRECTORY, named after the time, route and tenant:
+
+- <name>.prof: the pstats call graph, for snakeviz, gprof2dot or python -m pstats,
+- <name>.txt: the functions taking the most cumulative time, and their callers.
+
+The report name is returned in the X-CFFA-Profile response header. Only the request thread is profiled: reads
+fanned out by concurrentReads show as time waiting in ReadFanOut.gather. One request at a time is profiled per
+process; a request asking for a profile while another is being profiled is served without one.
+
+"""
+
+import io
+import os
+import re
+import time
+import pstats
+import cProfile
+import logging
+import threading
+
+# logging config
+logger = logging.getLogger("cffa_requestProfiler")
+logger.setLevel(logging.DEBUG)
+# console handler
+ch = logging.StreamHandler()
+ch.setLevel(logging.DEBUG)
+formatting = logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+ch.setFormatter(formatting)
+logger.addHandler(ch)
+
+PROFILE_ARGUMENT = "profile"
+PROFILE_HEADER = "X-CFFA-Profile"
+# functions listed in the text report
+REPORT_LINES = 40
+
+
+class RequestProfiler:
+    """ Profiles requests that ask for it and saves a report per request.
+
+    Attributes
+    ----------
+
+    directory : str
+        Directory the reports are saved to, created if missing.
+
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        self._busy = threading.Lock()
+
+    @staticmethod
+    def requested(request):
+        """ True if the request asks to be profiled.
+
+        Parameters
+        ----------
+
+        request : flask.Request
+        """
+        return request.args.get(PROFILE_ARGUMENT) == "1" or request.headers.get(PROFILE_HEADER) == "1"
+
+    def start(self):
+        """ Start profiling the calling thread.
+
+        Returns
+        -------
+
+        :cProfile.Profile
+            The running profile, or None if another request of the process is being profiled.
+        """
+        if not self._busy.acquire(blocking=False):
+            logger.info("Profile requested while another request is being profiled, not profiled")
+            return None
+
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def discard(self, profile):
+        """ Stop a profile from start() without saving it, eg: when the request failed before its response. """
+        profile.disable()
+        self._busy.release()
+
+    def report_name(self, route, tenant_id):
+        """ File name, without extension, of the report of a request to route by tenant_id. """
+        now = time.time()
+        return "-".join([time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + "{:03d}".format(int(now * 1000) % 1000),
+                         re.sub(r"[^A-Za-z0-9_]", "_", str(route)),
+                         re.sub(r"[^A-Za-z0-9_]", "_", str(tenant_id)),
+                         str(os.getpid())])
+
+    def finish(self, profile, name, path):
+        """ Stop a profile from start() and save its reports. Called from the thread that started it.
+
+        Parameters
+        ----------
+
+        profile : cProfile.Profile
+            As returned by start().
+
+        name : str
+            Report name from report_name().
+
+        path : str
+            Path and query string of the request, recorded in the text report.
+        """
+        profile.disable()
+        self._busy.release()
+        try:
+            profile.dump_stats(os.path.join(self.directory, name + ".prof"))
+            text = io.StringIO()
+            text.write(path + "\n\n")
+            stats = pstats.Stats(profile, stream=text).sort_stats("cumulative")
+            stats.print_stats(REPORT_LINES)
+            stats.print_callers(REPORT_LINES)
+            with open(os.path.join(self.directory, name + ".txt"), "w") as report:
+                report.write(text.getvalue())
+            logger.info("Saved profile " + name + " of " + path)
+        except (OSError, TypeError) as e:
+            logger.error("Could not save profile " + name + ": " + getattr(e, 'message', repr(e)))
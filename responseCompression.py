@@ -0,0 +1,198 @@
+""" WSGI middleware compressing CFFA responses with brotli or gzip.
+
+The HTML tables (all games, all transactions, ledgers) and JSON pages compress to a fraction of their size, but
+gunicorn sends them as they are. CompressionMiddleware wraps the Flask WSGI app:
+
+app.wsgi_app = responseCompression.CompressionMiddleware(app.wsgi_app)
+
+For each response it picks brotli or gzip from the request's Accept-Encoding and compresses the body as it is
+produced, so streamed responses are compressed chunk by chunk rather than buffered. The compressor is flushed after
+the first chunk and then every flush_size bytes, which lets the browser start on the top of a streamed page early.
+
+Responses are sent as they are when:
+
+- their Content-Type is not text, JSON or JavaScript (eg: the export zip archive from download_json),
+- they already have a Content-Encoding (eg: the precompressed static bundles, see staticAssets),
+- their Content-Length is below min_size,
+- they have no body (HEAD, 204, 304), are partial (206) or are marked Cache-Control: no-transform.
+
+Brotli requires the Brotli package; without it only gzip is offered.
+
+"""
+
+import zlib
+from werkzeug.http import parse_accept_header, parse_options_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/javascript",
+    "image/svg+xml"
+}
+
+
+class _GzipEncoder:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """ Compresses responses of a WSGI app with brotli or gzip, as negotiated with the client.
+
+    Attributes
+    ----------
+
+    app : callable
+        The wrapped WSGI app.
+
+    min_size : int
+        Responses with a smaller Content-Length are not compressed. Streamed responses (without a Content-Length) are
+        always compressed.
+
+    gzip_level : int
+        zlib compression level, 1 (fastest) to 9 (smallest).
+
+    brotli_quality : int
+        Brotli quality, 0 (fastest) to 11 (smallest). Responses are compressed on every request, so the default is
+        low; the static bundles are compressed at 11 once, at build time.
+
+    flush_size : int
+        Bytes of a response compressed between flushes to the client.
+
+    mimetypes : set
+        Content types that are compressed.
+
+    """
+
+    def __init__(self, app, min_size=500, gzip_level=6, brotli_quality=4, flush_size=16384,
+                 mimetypes=COMPRESSIBLE_TYPES):
+        self.app = app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.flush_size = flush_size
+        self.mimetypes = mimetypes
+
+    def _negotiate(self, environ):
+        """ Content-Encoding to use for a request, or None. """
+        if environ.get("REQUEST_METHOD") == "HEAD":
+            return None
+
+        accepted = parse_accept_header(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        if brotli is not None and accepted["br"] and accepted["br"] >= accepted["gzip"]:
+            return "br"
+        if accepted["gzip"]:
+            return "gzip"
+        return None
+
+    def _compressible(self, status, headers):
+        """ True if a response with this status and headers should be compressed. """
+        code = int(status.split(" ", 1)[0])
+        if code < 200 or code in (204, 206, 304):
+            return False
+
+        values = {name.lower(): value for name, value in headers}
+        if parse_options_header(values.get("content-type", ""))[0] not in self.mimetypes:
+            return False
+        if values.get("content-encoding", "identity") != "identity":
+            return False
+        if "no-transform" in values.get("cache-control", ""):
+            return False
+        if "content-length" in values and int(values["content-length"]) < self.min_size:
+            return False
+        return True
+
+    def __call__(self, environ, start_response):
+        encoding = self._negotiate(environ)
+        if encoding is None:
+            return self.app(environ, start_response)
+
+        state = {}
+
+        def compressing_start_response(status, headers, exc_info=None):
+            if self._compressible(status, headers):
+                headers = [(name, value) for name, value in headers if name.lower() != "content-length"]
+                headers = [(name, "W/" + value if name.lower() == "etag" and not value.startswith("W/") else value)
+                           for name, value in headers]
+                headers.append(("Content-Encoding", encoding))
+                if encoding == "br":
+                    state["encoder"] = _BrotliEncoder(self.brotli_quality)
+                else:
+                    state["encoder"] = _GzipEncoder(self.gzip_level)
+            if parse_options_header(dict((name.lower(), value) for name, value in headers)
+                                    .get("content-type", ""))[0] in self.mimetypes:
+                headers = _add_vary(headers)
+            return start_response(status, headers, exc_info)
+
+        return self._body(self.app(environ, compressing_start_response), state)
+
+    def _body(self, body, state):
+        """ Iterate over the app's response, compressing it if start_response chose an encoder. """
+        try:
+            flushed = False
+            unflushed = 0
+            for chunk in body:
+                encoder = state.get("encoder")
+                if encoder is None:
+                    yield chunk
+                    continue
+
+                data = encoder.compress(chunk)
+                unflushed += len(chunk)
+                # the first chunk is sent straight away, the rest once there is enough to compress well
+                if not flushed or unflushed >= self.flush_size:
+                    data += encoder.flush()
+                    flushed = True
+                    unflushed = 0
+                if data:
+                    yield data
+
+            if state.get("encoder") is not None:
+                yield state["encoder"].finish()
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+
+
+def _add_vary(headers):
+    """ headers with Accept-Encoding added to Vary, as responses now differ by the request's Accept-Encoding. """
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == "vary":
+            if "accept-encoding" not in value.lower() and value.strip() != "*":
+                headers[index] = (name, value + ", Accept-Encoding")
+            return headers
+
+    return headers + [("Vary", "Accept-Encoding")]
@@ -25,6 +25,12 @@ SECRET_KEY=[used for CSRF/session encryption protection in forms with flask ]
 PYTHONPATH=[should include link to cffadb, altough some debate better methods could be used]
 EXPORTDIRECTORY=[Directory to use to build database json exports]
 
+TENANT_CACHE_SIZE=[Optional, number of user tenancies cached per worker. Default 1024]
+TENANT_CACHE_TTL=[Optional, seconds a cached user tenancy is used before it is looked up again. Default 300]
+TENANT_CACHE_SYNC=[Optional, seconds before an access change made on one worker reaches the others. Default 5]
+JOB_WORKERS=[Optional, number of background jobs (imports, exports, delete all) run at once per worker. Default 2]
+PROFILE_DIRECTORY=[Optional, enables ?profile=1 for managers and saves request profiles here, see requestProfiler]
+
 GOOGLEKEYFILE=[Only used by testScript.py as keyfile is now uploaded server side]
 GOOGLE_SHEET=[Only used by testScript.py as gsheet name is set via cffa webpage]
 TRANSACTION_SRC_WKSHEET=[Only used by testScript.py as worksheet name is set via cffa webpage]
@@ -49,21 +55,31 @@ B)
 #!/bin/bash
 source venv/bin/activate
 exec gunicorn -b :5000 --certfile=cffa-signed.crt \
---keyfile=/cffa-signed.key --access-logfile - --error-logfile - -w 1 server:app
+--keyfile=/cffa-signed.key --access-logfile - --error-logfile - --preload 'server:create_app()'
 
 Starts production class CFFA on port 5000 with logs to stdout with signed certificates. Would typically be used
 alongside a nginx reverse proxy to redirect https to port 5000. (ngninx does not decrypt https in this case as
 Auth0 authenticates with flask not nginx.
 
+Run from the CFFA directory so gunicorn reads gunicorn.conf.py: 2 gthread workers of 32 threads each (see
+GUNICORN_WORKERS, GUNICORN_THREADS and GUNICORN_WORKER_CLASS), and each worker opens its DB clients after the fork.
+
 """
 from functools import wraps
 import json
+import hashlib
+import threading
+import time
+import datetime
+import zipfile
 from os import environ as env
 import os
 from werkzeug.exceptions import HTTPException
 
 from dotenv import load_dotenv, find_dotenv
-from flask import Flask, jsonify, redirect, render_template, session, url_for, flash, send_file, send_from_directory
+from flask import Flask, jsonify, redirect, render_template, session, url_for, flash, send_from_directory, g, \
+    request, abort, Response, make_response, stream_with_context, get_flashed_messages
+from flask_wtf.csrf import generate_csrf
 from flask_bootstrap import Bootstrap
 from authlib.integrations.flask_client import OAuth
 from six.moves.urllib.parse import urlencode
@@ -79,11 +95,39 @@ import pprint
 from cffadb import dbinterface
 import importExportCFFA
 import importDataFromGoogle
+import tenantContext
+import dataVersion
+import dashboard as dashboardViews
+import paging
+import gameIndex
+import viewModels
+import jobs
+import fragmentCache
+import staticAssets
+import responseCompression
+import concurrentReads
+import mongoConnection
+import requestProfiler
+from jinja2 import FileSystemBytecodeCache
+from pymongo import MongoClient
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
 from werkzeug.utils import secure_filename
 
 pp = pprint.PrettyPrinter()
 
 app = Flask(__name__, static_url_path='/static', static_folder='./static')
+# compiled templates are kept on disk so that new workers do not compile every template again, and heavy tables are
+# cached as fragments with the {% cache %} tag. Must be set before anything touches app.jinja_env.
+if not os.path.exists('cache/jinja'):
+    os.makedirs('cache/jinja')
+app.jinja_options = dict(app.jinja_options,
+                         extensions=list(app.jinja_options.get('extensions', [])) +
+                         [fragmentCache.FragmentCacheExtension],
+                         bytecode_cache=FileSystemBytecodeCache('cache/jinja'))
+# static bundles are referenced in templates as asset_url('cffa.js') and served from /assets/ (see staticAssets)
+assets = staticAssets.AssetManifest(app.static_folder)
+app.jinja_env.globals['asset_url'] = lambda name: url_for('asset', filename=assets.filename(name))
 app.secret_key = constants.SECRET_KEY
 app.debug = True
 csrf.init_app(app)
@@ -115,22 +159,151 @@ BACKEND_DBPWD = env.get(constants.BACKEND_DBPWD)
 BACKEND_DBHOST = env.get(constants.BACKEND_DBHOST)
 BACKEND_DBPORT = env.get(constants.BACKEND_DBPORT)
 BACKEND_DBNAME = env.get(constants.BACKEND_DBNAME)
-mongoConnectString = "mongodb://" + BACKEND_DBUSR + \
-                     ":" + BACKEND_DBPWD + \
-                     "@" + BACKEND_DBHOST + \
-                     ":" + BACKEND_DBPORT + \
-                     "/" + BACKEND_DBNAME
-
-try:
-    ourDB = dbinterface.FootballDB(mongoConnectString, BACKEND_DBNAME)
-    EXPORT_DIR = env.get(constants.EXPORTDIRECTORY)
-    app.logger.info("Export Dir is:" + EXPORT_DIR)
-    fileManager = importExportCFFA.CFFAImportExport(ourDB, EXPORT_DIR)
-except Exception as e:
-    app.logger.critical("ABORT. CFFA initialisation with DB failed with " +
-                        mongoConnectString + ". " +
-                        getattr(e, 'message', repr(e)))
-    exit(-1)
+TENANT_CACHE_SIZE = int(env.get(constants.TENANT_CACHE_SIZE, 1024))
+TENANT_CACHE_TTL = int(env.get(constants.TENANT_CACHE_TTL, 300))
+TENANT_CACHE_SYNC = int(env.get(constants.TENANT_CACHE_SYNC, 5))
+JOB_WORKERS = int(env.get(constants.JOB_WORKERS, 2))
+READ_WORKERS = int(env.get(constants.READ_WORKERS, 8))
+# pages hold CSRF tokens that expire after WTF_CSRF_TIME_LIMIT (1 hour), so validators are only reused within a window
+# well inside that limit.
+PAGE_ETAG_WINDOW = int(env.get(constants.PAGE_ETAG_WINDOW, 1800))
+# template statements rendered per chunk of a streamed page (see stream_template)
+STREAM_BUFFER = int(env.get(constants.STREAM_BUFFER, 40))
+# HTML and JSON responses are compressed with brotli or gzip as the browser accepts (see responseCompression)
+app.wsgi_app = responseCompression.CompressionMiddleware(
+    app.wsgi_app,
+    min_size=int(env.get(constants.COMPRESS_MIN_SIZE, 500)),
+    gzip_level=int(env.get(constants.COMPRESS_GZIP_LEVEL, 6)),
+    brotli_quality=int(env.get(constants.COMPRESS_BROTLI_QUALITY, 4)))
+# reads of a tenant go to the primary for this long after its data changes (see mongoConnection)
+READ_YOUR_WRITES_WINDOW = int(env.get(constants.READ_YOUR_WRITES_WINDOW, 120))
+mongoConnectString = mongoConnection.connection_string(BACKEND_DBUSR, BACKEND_DBPWD, BACKEND_DBHOST, BACKEND_DBPORT,
+                                                       BACKEND_DBNAME, mongoConnection.pool_options(env))
+mongoReadConnectString = mongoConnection.connection_string(BACKEND_DBUSR, BACKEND_DBPWD, BACKEND_DBHOST,
+                                                           BACKEND_DBPORT, BACKEND_DBNAME,
+                                                           mongoConnection.read_options(env))
+
+EXPORT_DIR = env.get(constants.EXPORTDIRECTORY)
+app.logger.info("Export Dir is:" + str(EXPORT_DIR))
+# opt-in request profiling, the hooks below are only registered when a directory is set
+PROFILE_DIR = env.get(constants.PROFILE_DIRECTORY)
+
+# process that opened the DB clients and thread pools below, see init_backend()
+_backend_pid = None
+_backend_lock = threading.Lock()
+
+
+def init_backend():
+    """ Open the DB clients (FootballDB and the CFFA state MongoClient), caches and thread pools of this process.
+
+    MongoClient connection pools and thread pools do not survive a fork, so they are never opened by create_app() or
+    at import. With gunicorn --preload the app is created in the master and forked, and each worker opens its own
+    backend from the post_fork hook in gunicorn.conf.py. Any process that has not opened its backend (no hook, flask
+    run, or a fork after opening) opens it on its first request.
+    """
+    global ourDB, ourReadDB, tenantContexts, cffaStateDB, tenantVersions, reads, \
+        dashboards, gameLabels, transactionPages, jobRunner, _backend_pid
+    with _backend_lock:
+        if _backend_pid == os.getpid():
+            return
+
+        try:
+            ourDB = dbinterface.FootballDB(mongoConnectString, BACKEND_DBNAME)
+            # the same DB on the replica set read connection, for read only pages
+            ourReadDB = dbinterface.FootballDB(mongoReadConnectString, BACKEND_DBNAME)
+            # CFFA's own collections (eg: tenant data versions) that are not managed by cffadb
+            cffaStateDB = MongoClient(mongoConnectString)[BACKEND_DBNAME]
+            tenantContexts = tenantContext.TenantContextCache(ourDB, TENANT_CACHE_SIZE, TENANT_CACHE_TTL, ourReadDB,
+                                                              cffaStateDB, TENANT_CACHE_SYNC)
+            tenantVersions = dataVersion.TenantDataVersions(cffaStateDB)
+            reads = concurrentReads.ReadFanOut(READ_WORKERS)
+            dashboards = dashboardViews.DashboardCache(tenantVersions, reads=reads)
+            gameLabels = dashboardViews.TenantViewCache(tenantVersions,
+                                                        lambda tenant, version: gameIndex.GameLabelIndex(
+                                                            list(reversed(dashboards.get(tenant).games.documents))))
+            transactionPages = dashboardViews.TenantViewCache(
+                tenantVersions,
+                lambda tenant, version: paging.KeysetList(
+                    tenant.read_db.get_all_transactions(),
+                    paging.TRANSACTION_DATE_KEY,
+                    lambda transaction: viewModels.TransactionRow(transaction, "-")))
+            jobRunner = jobs.JobRunner(cffaStateDB, JOB_WORKERS)
+        except Exception as e:
+            app.logger.critical("ABORT. CFFA initialisation with DB failed with " +
+                                mongoConnectString + ". " +
+                                getattr(e, 'message', repr(e)))
+            exit(-1)
+
+        _backend_pid = os.getpid()
+        app.logger.info("CFFA backend opened in process " + str(_backend_pid))
+
+
+@app.before_request
+def open_backend():
+    """ Opens the process's backend if no post_fork hook has done so. """
+    if _backend_pid != os.getpid():
+        init_backend()
+
+
+def start_profile():
+    """ Profile the request if a manager asked for it, see requestProfiler. Registered only when PROFILE_DIRECTORY is
+    set.
+    """
+    if not profiler.requested(request) or constants.PROFILE_KEY not in session:
+        return
+
+    tenant = tenantContexts.get(session[constants.PROFILE_KEY].get('user_id', None))
+    if tenant is None or tenant.player_role:
+        return
+
+    g.profile = profiler.start()
+    g.profile_tenant = tenant.tenant_id
+
+
+def finish_profile(response):
+    """ Save the profile of the request once its response, streamed or not, has been sent. """
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+
+    name = profiler.report_name(request.endpoint, g.profile_tenant)
+    path = request.full_path
+    response.call_on_close(lambda: profiler.finish(profile, name, path))
+    response.headers[requestProfiler.PROFILE_HEADER] = name
+    return response
+
+
+def discard_profile(exception=None):
+    """ Stop a profile left running by a request that ended without a response. """
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profiler.discard(profile)
+
+
+if PROFILE_DIR:
+    profiler = requestProfiler.RequestProfiler(PROFILE_DIR)
+    app.before_request(start_profile)
+    app.after_request(finish_profile)
+    app.teardown_request(discard_profile)
+    app.logger.info("Request profiling enabled, profiles are saved to " + PROFILE_DIR)
+
+
+def create_app():
+    """ CFFA app factory, eg: gunicorn --preload 'server:create_app()'
+
+    Configuration, static bundles and routes are set up at import. The factory also compiles every template, so that
+    when the app is created in the gunicorn master the forked workers share the compiled templates. DB clients are
+    not opened here but per process by init_backend().
+
+    Returns
+    -------
+
+    :flask.Flask
+    """
+    for template_name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(template_name)
+    app.logger.info("Compiled " + str(len(app.jinja_env.list_templates())) + " templates")
+    return app
 
 
 @app.errorhandler(Exception)
@@ -180,7 +353,7 @@ def requires_manager_role(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         user_id = session[constants.PROFILE_KEY].get('user_id')
-        player_confirmed = ourDB.validate_user_as_player_role(user_id)
+        player_confirmed = tenantContexts.is_player(user_id)
         if player_confirmed:
             return redirect('/playerSummary')
 
@@ -195,22 +368,282 @@ def set_tenancy(f):
     onto any flask webserver. This also ensures concurrent user access with different tenancies do not
     pick up the wrong tenancy in their session
 
-    Note to self: perhaps the ourDB object should be part of the session object as this would be retained
-    between each user request. This would mean the tenancy collection would be global and initialised on start up, and
-    ourDB would be set in the callback endpoint
+    The tenancy is resolved per request into flask g: g.tenant holds the TenantContext and g.db the FootballDB view
+    for this request only. The shared ourDB is never loaded with a tenancy, so requests in other threads cannot see it.
 
     """
     @wraps(f)
     def decorated(*args, **kwargs):
-        if not ourDB.load_team_tables_for_user_id(session[constants.PROFILE_KEY].get('user_id', None)):
+        tenant = tenantContexts.get(session[constants.PROFILE_KEY].get('user_id', None))
+        if tenant is None:
             # new manager entry point, redirect to onboarding wizard
             return redirect(url_for('onboarding'))
 
+        g.tenant = tenant
+        g.db = tenant.db
         return f(*args, **kwargs)
 
     return decorated
 
 
+def requires_manager_tenancy(f):
+    """ Single stage equivalent of requires_auth, requires_manager_role and set_tenancy for manager endpoints. The
+    role and tenancy are resolved together from the tenancy cache, so a warm request costs no DB round trips before
+    the endpoint logic runs.
+
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if constants.PROFILE_KEY not in session:
+            return redirect('/login')
+
+        tenant = tenantContexts.get(session[constants.PROFILE_KEY].get('user_id', None))
+        if tenant is None:
+            # new manager entry point, redirect to onboarding wizard
+            return redirect(url_for('onboarding'))
+
+        if tenant.player_role:
+            return redirect('/playerSummary')
+
+        g.tenant = tenant
+        g.db = tenant.db
+        return f(*args, **kwargs)
+
+    return decorated
+
+
+def tenant_data_stamp():
+    """ (data version, last changed) of the request's tenancy, read once per request (see TenantDataVersions.stamp).
+    """
+    if 'data_stamp' not in g:
+        g.data_stamp = tenantVersions.stamp(g.tenant.tenant_id)
+    return g.data_stamp
+
+
+def secondary_reads(f):
+    """ Route the endpoint's reads of the team data (g.tenant.read_db) to the replica set secondaries, unless the
+    team's data has changed in the last READ_YOUR_WRITES_WINDOW seconds, when a secondary may not have the change
+    yet. Derived state that is written back (team summaries, ledgers) is always rebuilt from g.db, the primary.
+    Must be applied below the tenancy decorators.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        updated = tenant_data_stamp()[1]
+        if updated is None or \
+                datetime.datetime.utcnow() - updated > datetime.timedelta(seconds=READ_YOUR_WRITES_WINDOW):
+            g.tenant.use_secondary_reads()
+        return f(*args, **kwargs)
+
+    return decorated
+
+
+def tenant_data_changed():
+    """ Bump the data version of the request's tenancy. Must be called after every write to the team's data so that
+    cached views of the data are rebuilt.
+    """
+    tenantVersions.bump(g.tenant.tenant_id)
+    g.pop('data_stamp', None)
+
+
+def fragment_key(build):
+    """ Key for the {% cache %} template fragments of the request tenancy rendered from a cached view (see
+    fragmentCache).
+
+    Parameters
+    ----------
+
+    build : str
+        Build key of the view being rendered, from TenantViewCache.get_keyed
+    """
+    return g.tenant.tenant_id + ":" + build
+
+
+def _template_revision():
+    """ Digest of the templates as deployed, so that page validators change when the pages themselves change. """
+    digest = hashlib.sha1()
+    template_dir = os.path.join(app.root_path, 'templates')
+    for name in sorted(os.listdir(template_dir)):
+        stat = os.stat(os.path.join(template_dir, name))
+        digest.update("{}:{}:{};".format(name, stat.st_size, int(stat.st_mtime)).encode())
+    return digest.hexdigest()[:12]
+
+
+# pages link to the hashed bundles, so they change with the bundles as well as the templates
+TEMPLATE_REVISION = _template_revision() + assets.revision()
+
+
+def conditional_page(f):
+    """ Answer GETs of a page with 304 Not Modified when the browser (or proxy) already holds the current version.
+
+    Pages are validated with a weak ETag built from the tenant's data version (dataVersion.TenantDataVersions) and
+    the few other things a page depends on: the page, the user and their CSRF token, the deployed templates and static
+    bundles and a PAGE_ETAG_WINDOW time window (for CSRF token expiry and date dependent tables). The check needs only
+    the cached tenancy and one read of the data version, so it runs before the endpoint does any DB aggregation or
+    rendering.
+    Pages with flash messages pending are always rendered. Must be applied below the tenancy decorators.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or '_flashes' in session:
+            return f(*args, **kwargs)
+
+        version, updated = tenant_data_stamp()
+        etag = hashlib.sha1("|".join([request.full_path,
+                                      g.tenant.tenant_id,
+                                      str(version),
+                                      str(session[constants.PROFILE_KEY].get('user_id')),
+                                      str(session.get('csrf_token')),
+                                      TEMPLATE_REVISION,
+                                      str(int(time.time() // PAGE_ETAG_WINDOW))]).encode()).hexdigest()
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        if updated is not None:
+            response.last_modified = updated
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    return decorated
+
+
+def player_roster():
+    """ The request tenancy's players and player select labels, loaded once per request and shared by every form and
+    handler of the request.
+
+    Returns
+    -------
+
+    :formHandler.PlayerRoster
+    """
+    if 'roster' not in g:
+        g.roster = formHandler.PlayerRoster(g.db.get_all_players())
+    return g.roster
+
+
+def game_index():
+    """ Game label index of the request tenancy for the edit/delete game pickers, built from the cached dashboard
+    snapshot once per data version.
+
+    Returns
+    -------
+
+    :gameIndex.GameLabelIndex
+    """
+    return gameLabels.get(g.tenant)
+
+
+def game_object_id(game_id):
+    """ Database ID of a game from the ID in a URL. Aborts with 404 if the ID is malformed. """
+    try:
+        return ObjectId(game_id)
+    except (InvalidId, TypeError):
+        abort(404)
+
+
+def stream_template(template_name, **context):
+    """ Render a template as a streamed response, sending the page to the browser as it is rendered instead of once
+    it is complete. Rows can be passed as iterators (eg: over a DB cursor) so they are never all held in memory.
+
+    The session is saved before a streamed body is rendered, so anything the template would store in the session
+    (popping flash messages, the CSRF token) is done here first.
+
+    Parameters
+    ----------
+
+    template_name : str
+        As for render_template.
+
+    context :
+        Template variables, as for render_template.
+
+    Returns
+    -------
+
+    :flask.Response
+    """
+    get_flashed_messages()
+    generate_csrf()
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    # send the page in chunks large enough to compress well rather than one per template statement
+    stream.enable_buffering(STREAM_BUFFER)
+    return Response(stream_with_context(stream))
+
+
+def keyset_page_json(listing):
+    """ Serves one page of a KeysetList as JSON for the table pagers. The page is selected by the after (cursor) and
+    limit request arguments.
+
+    Parameters
+    ----------
+
+    listing : paging.KeysetList
+        Cached listing for the request's tenancy, with a view model (viewModels.GameRow or TransactionRow) per row.
+    """
+    try:
+        rows, next_cursor = listing.page(request.args.get('after', None),
+                                         request.args.get('limit', paging.PAGE_SIZE, type=int))
+    except ValueError:
+        abort(400)
+
+    return jsonify(rows=[row.cells() for row in rows], next=next_cursor)
+
+
+def submit_tenant_job(kind, work):
+    """ Run work as a background job against the request's tenancy and bump the tenant data version when it has
+    finished. The job keeps the request's FootballDB view, which is private to the request so is safe to use from the
+    job thread once the request has returned.
+
+    Parameters
+    ----------
+
+    kind : str
+        jobs.GOOGLE_IMPORT, jobs.EXPORT or jobs.DELETE_ALL
+
+    work : callable
+        work(job, db) does the work and returns a message for the user.
+
+    Returns
+    -------
+
+    :str
+        job ID
+    """
+    tenant = g.tenant
+
+    def run(job):
+        try:
+            # exports only read, so use the read routing of the request
+            return work(job, tenant.read_db if kind == jobs.EXPORT else tenant.db)
+        finally:
+            if kind != jobs.EXPORT:
+                tenantVersions.bump(tenant.tenant_id)
+
+    return jobRunner.submit(tenant.tenant_id, tenant.user_id, kind, run)
+
+
+def job_for_session(job_id):
+    """ The job record for job_id, provided it was started by the session user or belongs to their team. Aborts with
+    404 otherwise, so job IDs of other teams are indistinguishable from unknown IDs.
+    """
+    job = jobRunner.get(job_id)
+    if job is None:
+        abort(404)
+
+    user_id = session[constants.PROFILE_KEY].get('user_id', None)
+    if job.get("user_id") != user_id:
+        tenant = tenantContexts.get(user_id)
+        if tenant is None or tenant.player_role or tenant.tenant_id != job.get("tenant_id"):
+            abort(404)
+
+    return job
+
+
 # Controllers API
 @app.route('/')
 def home():
@@ -274,25 +707,45 @@ def favicon():
                                'favicon.ico', mimetype='image/vnd.microsoft.icon')
 
 
+@app.route('/assets/<filename>')
+def asset(filename):
+    """ Serves the fingerprinted static bundles, precompressed to suit the browser. Bundle names change with their
+    content, so browsers may keep them for a year without revalidating.
+    """
+    variant = assets.variant(filename, request.accept_encodings)
+    if variant is None:
+        abort(404)
+
+    sent_file, encoding, mimetype = variant
+    response = send_from_directory(assets.dist_dir, sent_file, mimetype=mimetype, cache_timeout=31536000)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
 @app.route('/cffa')
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
+@conditional_page
+@secondary_reads
 def entry_screen():
     """ Main screen for manager. If user collections do not exist assumes new user and redirects to onboarding screen.
      """
-    # from username lets check tenancy. Use metadata in Auth0 for userID. This will be unique.
-    if not ourDB.load_team_tables_for_user_id(session[constants.PROFILE_KEY].get('user_id', None)):
-        # new manager entry point, redirect to onboarding wizard
-        return redirect(url_for('onboarding'))
-
+    # tenancy (from the Auth0 userID) has been resolved by requires_manager_tenancy, which redirects to onboarding if
+    # there is none.
     app.logger.debug('Rendering entry_screen.html')
+    build, snapshot = dashboards.get_keyed(g.tenant)
+    all_games, next_games = snapshot.games.page()
     return render_template("entryScreen.html",
-                           playerSummaries=ourDB.get_active_player_summary(),
-                           allPlayers=ourDB.get_full_summary(),
-                           recentGames=ourDB.get_recent_games(),
-                           allGames=ourDB.get_all_games(),
-                           transactions=ourDB.get_recent_transactions(),
+                           playerSummaries=snapshot.player_summaries,
+                           allPlayers=snapshot.all_players,
+                           recentGames=snapshot.recent_games,
+                           allGames=all_games,
+                           allGamesNext=next_games,
+                           transactions=snapshot.recent_transactions,
+                           fragmentKey=fragment_key(build),
                            cffauser=session[constants.PROFILE_KEY].get('name'))
 
 
@@ -312,9 +765,10 @@ def onboarding():
             app.logger.critical("No user_id set in authenticator, cannot onboard")
             message = "No user_id set in authenticator. Cannot on-board this user"
         else:
-            message = ourDB.add_team(add_team_form.teamname.data,
-                                     session[constants.PROFILE_KEY].get('user_id', None),
-                                     session[constants.PROFILE_KEY].get('name'))
+            message = tenantContexts.new_db_view().add_team(add_team_form.teamname.data,
+                                                            session[constants.PROFILE_KEY].get('user_id', None),
+                                                            session[constants.PROFILE_KEY].get('name'))
+            tenantContexts.invalidate(session[constants.PROFILE_KEY].get('user_id', None))
 
         flash(message)
         # when switching back to entry_screen we will end up switching the db collections to the tenant
@@ -327,9 +781,8 @@ def onboarding():
 
 
 @app.route('/games', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
+@conditional_page
 def manage_games():
     """ Functionality to manage games - add, edit, remove. The logic handles the response when adding a new game, but
     edit and delete game are redirected to their endpoints via the form action setting in the manage_games.html
@@ -339,12 +792,8 @@ def manage_games():
     # handle guests too
     app.logger.debug('Rendering manage_games')
     no_players_form = formHandler.AddGameNoPlayers()
-    games = ourDB.get_all_games()
-    game_labels = formHandler.create_labels_for_games(games)
     edit_game_form = formHandler.EditGameSelectForm()
-    edit_game_form.game.choices = game_labels
     delete_game_form = formHandler.DeleteGameSelectForm()
-    delete_game_form.game.choices = game_labels
 
     # if no_players_form.validate_on_submit():
     if no_players_form.submit.data and no_players_form.validate():
@@ -352,7 +801,6 @@ def manage_games():
         return redirect(redirect_to_new_game)
 
     return render_template("manageGames.html",
-                           allGames=ourDB.get_all_games(),
                            form=no_players_form,
                            editGameform=edit_game_form,
                            deleteGameform=delete_game_form,
@@ -360,9 +808,7 @@ def manage_games():
 
 
 @app.route('/newgame/<int:players>', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def new_game(players):
     """ Renders and processes the new game form.
 
@@ -375,42 +821,37 @@ def new_game(players):
 
     app.logger.debug('Rendering new_game with players' + str(players))
     booker = session[constants.PROFILE_KEY].get('name')
-    new_game_defaults = ourDB.get_defaults_for_new_game(booker)
+    new_game_defaults = g.db.get_defaults_for_new_game(booker)
     no_players_form = formHandler.GameDetails(players, obj=new_game_defaults)
-    if ourDB.new_manager():
+    if g.db.new_manager():
         flash("TIP: When adding a game, a player will be created if it doesn't already exist")
 
     if no_players_form.validate_on_submit():
-        ourDB.add_game(formHandler.game_form_to_football(no_players_form))
+        g.db.add_game(formHandler.game_form_to_football(no_players_form))
+        tenant_data_changed()
         flash("Game on {} for {} players has been added".format(no_players_form.gamedate.data, players))
         return redirect(url_for('entry_screen'))
 
     return render_template("newGame.html", noOfPlayers=players,
                            form=no_players_form,
-                           activePlayerList=ourDB.get_active_players_for_new_game(),
+                           activePlayerList=g.db.get_active_players_for_new_game(),
                            cffauser=session[constants.PROFILE_KEY].get('name')
                            )
 
 
 @app.route('/editgame', methods=['POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def edit_game():
     """  Processes edit game select form (ie: which game to edit).
     """
-    games = ourDB.get_all_games()
-    game_labels = formHandler.create_labels_for_games(games)
     select_game_form = formHandler.EditGameSelectForm()
-    select_game_form.game.choices = game_labels
-    delete_game_form = formHandler.DeleteGameSelectForm()
 
     app.logger.debug("Got into edit_game" + str(select_game_form))
 
-    if select_game_form.validate_on_submit():
-        choice = select_game_form.game.data
-        app.logger.debug("choice was" + str(choice))
-        return redirect(url_for('apply_edit_game', choice=choice))
+    if select_game_form.validate_on_submit() and select_game_form.game.data in game_index():
+        game_id = select_game_form.game.data
+        app.logger.debug("choice was" + str(game_id))
+        return redirect(url_for('apply_edit_game', game_id=game_id))
 
     # we should not get here as this is always called with a POST request for edit via manage_games.
     app.logger.warning("Should not get here in edit_game without a successful POST entry condition. Or rather "
@@ -419,22 +860,22 @@ def edit_game():
     return redirect(url_for('entry_screen'))
 
 
-@app.route('/applyEditGame/<int:choice>', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
-def apply_edit_game(choice):
+@app.route('/applyEditGame/<game_id>', methods=['GET', 'POST'])
+@requires_manager_tenancy
+def apply_edit_game(game_id):
     """  Processes edit game form rendering and form input processing. Unlike new game form this does not check the
     number of players selected.
 
-        choice : int
-        Index to selected game (in list obtained from get_all_games(). Possible flaw if another user adds a new game for
-        te same team whilst in this workflow. (edge case)
+        game_id : str
+        Database ID of the selected game, from create_labels_for_games().
 
     """
     app.logger.debug("Entering apply_edit_game()")
-    games = ourDB.get_all_games()
-    edit_game_details = ourDB.get_game_details_for_edit_delete_form(games[choice].get("_id"), True)
+    db_id = game_object_id(game_id)
+    edit_game_details = g.db.get_game_details_for_edit_delete_form(db_id, True)
+    if edit_game_details is None:
+        flash("Unable to edit selected game, it may have been deleted")
+        return redirect(url_for('manage_games'))
     players = 0  # 0 = supresses the validation logic for number of players selected in form.
     edit_players_form = formHandler.GameDetails(players, obj=edit_game_details)
 
@@ -442,7 +883,8 @@ def apply_edit_game(choice):
 
     if edit_players_form.validate_on_submit():
         flash("Game on date {} has been edited".format(edit_players_form.gamedate.data))
-        ourDB.edit_game(games[choice].get("_id"), formHandler.game_form_to_football(edit_players_form))
+        g.db.edit_game(db_id, formHandler.game_form_to_football(edit_players_form))
+        tenant_data_changed()
         return redirect(url_for('entry_screen'))
 
     return render_template("editGame.html",
@@ -451,27 +893,19 @@ def apply_edit_game(choice):
 
 
 @app.route('/deletegame', methods=['POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def delete_game():
     """  Processes delete game select form (ie: which game to delete). As it has been redirected from a completed
     form we should not get to the end of the function unless there are no games.
- TO DO: Probably can delete the edit game form logic below.
     """
 
     app.logger.debug("Entering delete_game")
-    games = ourDB.get_all_games()
-    game_labels = formHandler.create_labels_for_games(games)
-    select_game_form = formHandler.EditGameSelectForm()
-    select_game_form.game.choices = game_labels
     delete_game_form = formHandler.DeleteGameSelectForm()
-    delete_game_form.game.choices = game_labels
 
-    if delete_game_form.validate_on_submit():
-        choice = delete_game_form.game.data
-        app.logger.debug("delete choice was" + str(choice))
-        return redirect(url_for('apply_delete_game', choice=choice))
+    if delete_game_form.validate_on_submit() and delete_game_form.game.data in game_index():
+        game_id = delete_game_form.game.data
+        app.logger.debug("delete choice was" + str(game_id))
+        return redirect(url_for('apply_delete_game', game_id=game_id))
 
     app.logger.warning("Should not get here in delete_game without a successful POST entry condition. "
                        "Or rather there are no games in DB!")
@@ -479,25 +913,25 @@ def delete_game():
     return redirect(url_for('entry_screen'))
 
 
-@app.route('/applyDeletegame/<int:choice>', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
-def apply_delete_game(choice):
+@app.route('/applyDeletegame/<game_id>', methods=['GET', 'POST'])
+@requires_manager_tenancy
+def apply_delete_game(game_id):
     """  Processes delete game form rendering and form input processing.
 
-        choice : int
-        Index to selected game (in list obtained from getAllGames(). Possible flaw if another user adds a new game for
-        te same team whilst in this workflow. (edge case)
+        game_id : str
+        Database ID of the selected game, from create_labels_for_games().
 
     """
     app.logger.debug("Entering apply_delete_game")
-    games = ourDB.get_all_games()
-    db_id = games[choice].get("_id")
-    delete_game_details = ourDB.get_game_details_for_edit_delete_form(db_id, False)
+    db_id = game_object_id(game_id)
+    delete_game_details = g.db.get_game_details_for_edit_delete_form(db_id, False)
+    if delete_game_details is None:
+        flash("Unable to delete selected game, it may have already been deleted")
+        return redirect(url_for('manage_games'))
     delete_confirmation_form = formHandler.ConfirmDelete()
     if delete_confirmation_form.validate_on_submit():
-        flash_message = ourDB.delete_game(db_id)
+        flash_message = g.db.delete_game(db_id)
+        tenant_data_changed()
         flash(flash_message)
         return redirect(url_for('entry_screen'))
 
@@ -508,9 +942,7 @@ def apply_delete_game(choice):
 
 
 @app.route('/players', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def manage_players():
     """ Functionality to manage players - add, edit, retire and reactivate. The logic handles the response when
     adding a new player, but edit, retire and reactivate players  are redirected to their endpoints via the form
@@ -519,21 +951,19 @@ def manage_players():
     # add player, edit player, cannot delete player if they have played a game
     # dump players
     app.logger.debug("Entering manage_players()")
-    all_players = ourDB.get_all_player_details_for_player_edit()  # in obj classes
-    add_player_form = formHandler.NewPlayer(
-        formHandler.create_labels_for_players(ourDB.get_all_players(), action="allplayers"))
+    all_players = g.db.get_all_player_details_for_player_edit()  # in obj classes
+    roster = player_roster()
+    add_player_form = formHandler.NewPlayer(roster.all_players)
     edit_player_form = formHandler.SelectPlayerToEdit(obj=all_players)
-    edit_player_form.oldplayer.choices = formHandler.create_labels_for_players(ourDB.get_all_players(),
-                                                                               action="allplayers")
+    edit_player_form.oldplayer.choices = roster.all_players
     retire_player_form = formHandler.RetirePlayer()
-    retire_player_form.retireplayer.choices = formHandler.create_labels_for_players(ourDB.get_all_players(),
-                                                                                    action="retire")
+    retire_player_form.retireplayer.choices = roster.retire
     reactivate_player_form = formHandler.ReactivatePlayer()
-    reactivate_player_form.reactivateplayer.choices = formHandler.create_labels_for_players(ourDB.get_all_players(),
-                                                                                            action="reactivate")
+    reactivate_player_form.reactivateplayer.choices = roster.reactivate
 
     if add_player_form.validate_on_submit():
-        flash_message = ourDB.add_player(formHandler.new_player_form_to_football(add_player_form))
+        flash_message = g.db.add_player(formHandler.new_player_form_to_football(add_player_form))
+        tenant_data_changed()
         flash(flash_message)
         return redirect(url_for('entry_screen'))
 
@@ -546,9 +976,7 @@ def manage_players():
 
 
 @app.route('/editSelectPlayer', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def edit_select_player():
     """  Processes edit player select form (ie: which player to edit) and then redirects to edit player endpoint. Form
     should always validate as endpoint is a post redirect from the manage_players page.
@@ -556,10 +984,9 @@ def edit_select_player():
     TO DO: Remove GET method from function.
     """
     app.logger.debug("We got to edit_select_player")
-    all_players = ourDB.get_all_player_details_for_player_edit()  # in obj classes
-    player_list = formHandler.create_labels_for_players(ourDB.get_all_players(), action="allplayers")
+    all_players = g.db.get_all_player_details_for_player_edit()  # in obj classes
     edit_player_form = formHandler.SelectPlayerToEdit(obj=all_players)
-    edit_player_form.oldplayer.choices = player_list
+    edit_player_form.oldplayer.choices = player_roster().all_players
 
     if edit_player_form.validate_on_submit():
         # only got the player to edit, now redirect to
@@ -571,27 +998,28 @@ def edit_select_player():
 
 
 @app.route('/editPlayer/<int:player>', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def edit_player(player):
     """  Renders and post processes the edit player form for the selected player.
 
         player : int
-        Index to selected player (in list obtained from create_labels_for_players() and removes selected player from
-        list. This is for validation to prevent a player name duplicate occurring during edit.
+        Index to selected player (in PlayerRoster.all_players) and removes selected player from list. This is for
+        validation to prevent a player name duplicate occurring during edit.
 
     """
     app.logger.debug('Entering edit_player')
-    player_list = formHandler.create_labels_for_players(ourDB.get_all_players(), action="allplayers")
-    our_players = dict(player_list)
-    player_defaults = ourDB.get_player_defaults_for_edit(our_players.get(player))
+    roster = player_roster()
+    player_name = roster.name(player)
+    if player_name is None:
+        abort(404)
+    player_defaults = g.db.get_player_defaults_for_edit(player_name)
     # remove own player name from player_list for validation
-    player_list.pop(player)
+    player_list = [label for label in roster.all_players if label[0] != player]
     edit_player_form = formHandler.EditPlayer(player_list, obj=player_defaults)
 
     if edit_player_form.validate_on_submit():
-        message = ourDB.edit_player(our_players.get(player), formHandler.edit_player_form_to_football(edit_player_form))
+        message = g.db.edit_player(player_name, formHandler.edit_player_form_to_football(edit_player_form))
+        tenant_data_changed()
         flash(message)
         return redirect(url_for('entry_screen'))
 
@@ -600,9 +1028,7 @@ def edit_player(player):
 
 
 @app.route('/retirePlayer', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def retire_player():
     """  Processes retire player select form (ie: which player to retire). Form
     should always validate as endpoint is a post redirect from the manage_players page.
@@ -610,14 +1036,14 @@ def retire_player():
     TO DO: Remove GET method from function.
     """
     app.logger.debug('We got to retire player')
-    all_players = ourDB.get_all_player_details_for_player_edit()  # in obj classes
-    player_list = formHandler.create_labels_for_players(ourDB.get_all_players(), action="retire")
+    roster = player_roster()
     retire_player_form = formHandler.RetirePlayer()
-    retire_player_form.retireplayer.choices = player_list
+    retire_player_form.retireplayer.choices = roster.retire
 
     if retire_player_form.validate_on_submit():
-        our_players = dict(player_list)
-        flash_message = ourDB.retire_player(our_players.get(retire_player_form.retireplayer.data))
+        player_name = roster.name(retire_player_form.retireplayer.data)
+        flash_message = g.db.retire_player(player_name)
+        tenant_data_changed()
         flash(flash_message)
         return redirect(url_for('entry_screen'))
 
@@ -628,9 +1054,7 @@ def retire_player():
 
 
 @app.route('/reactivatePlayer', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def reactivate_player():
     """  Processes reactivate (from retirement) player select form (ie: which player to reactivate). Form
     should always validate as endpoint is a post redirect from the manage_players page.
@@ -638,13 +1062,14 @@ def reactivate_player():
     TO DO: Remove GET method from function.
     """
     app.logger.debug('We got to reactivate player')
-    player_list = formHandler.create_labels_for_players(ourDB.get_all_players(), action="reactivate")
+    roster = player_roster()
     reactivate_player_form = formHandler.ReactivatePlayer()
-    reactivate_player_form.reactivateplayer.choices = player_list
+    reactivate_player_form.reactivateplayer.choices = roster.reactivate
 
     if reactivate_player_form.validate_on_submit():
-        our_players = dict(player_list)
-        flash_message = ourDB.reactivate_player(our_players.get(reactivate_player_form.reactivateplayer.data))
+        player_name = roster.name(reactivate_player_form.reactivateplayer.data)
+        flash_message = g.db.reactivate_player(player_name)
+        tenant_data_changed()
         flash(flash_message)
         return redirect(url_for('entry_screen'))
 
@@ -656,9 +1081,9 @@ def reactivate_player():
 
 
 @app.route('/transactions', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
+@conditional_page
+@secondary_reads
 def manage_transactions():
     """ Functionality to manage transactions - add, edit, and show all. The logic handles the response when adding a new
     transaction, but edit and list transactions are redirected to their endpoints via the form action setting in the
@@ -669,34 +1094,63 @@ def manage_transactions():
     # add payment, edit payment, remove payment, autopayquick, view all transactions
     # needs to sort on transaction from recent first.
     app.logger.debug('We got to transactions()')
-    transaction_defaults = ourDB.get_defaults_for_transaction_form(session[constants.PROFILE_KEY].get('name'))
+    transaction_defaults = g.db.get_defaults_for_transaction_form(session[constants.PROFILE_KEY].get('name'))
     add_transaction_form = formHandler.NewTransaction(obj=transaction_defaults)
-    add_transaction_form.player.choices = formHandler.create_labels_for_players(ourDB.get_all_players(),
-                                                                                action="allplayers")
+    roster = player_roster()
+    add_transaction_form.player.choices = roster.all_players
     quick_autopay_form = formHandler.AutopayforCurrentUser()
 
     if add_transaction_form.validate_on_submit():
-        player_list = dict(add_transaction_form.player.choices)
-        flash_message = \
-            ourDB.add_transaction(formHandler.new_transaction_form_to_football(add_transaction_form,
-                                                                               player_list.get(
-                                                                                   add_transaction_form.player.data,
-                                                                                   None)))
+        transaction = formHandler.new_transaction_form_to_football(add_transaction_form,
+                                                                   roster.name(add_transaction_form.player.data))
+        flash_message = g.db.add_transaction(transaction)
+        tenant_data_changed()
         flash(flash_message)
         return redirect(url_for('manage_transactions'))
 
-    return render_template("manageTransactions.html",
+    build, listing = transactionPages.get_keyed(g.tenant)
+    all_transactions, next_transactions = listing.page()
+    return stream_template("manageTransactions.html",
                            addTransactionForm=add_transaction_form,
                            quickAutoPayForm=quick_autopay_form,
-                           autoPayDetails=ourDB.get_autopay_details(session[constants.PROFILE_KEY].get('name')),
-                           allTransactions=ourDB.get_all_transactions(),
+                           autoPayDetails=g.db.get_autopay_details(session[constants.PROFILE_KEY].get('name')),
+                           allTransactions=all_transactions,
+                           allTransactionsNext=next_transactions,
+                           fragmentKey=fragment_key(build),
                            cffauser=session[constants.PROFILE_KEY].get('name'))
 
 
+@app.route('/api/games')
+@requires_manager_tenancy
+@secondary_reads
+def games_page_json():
+    """ JSON pages of all games, newest first, used by the All Games table on the entry screen.
+    """
+    return keyset_page_json(dashboards.get(g.tenant).games)
+
+
+@app.route('/api/games/search')
+@requires_manager_tenancy
+def games_search_json():
+    """ Typeahead search for the edit/delete game pickers. The q argument is matched against game dates and player
+    names, see gameIndex.GameLabelIndex.search.
+    """
+    results = game_index().search(request.args.get('q', ''),
+                                  min(request.args.get('limit', gameIndex.SEARCH_LIMIT, type=int), paging.PAGE_SIZE))
+    return jsonify(results=[{"id": game_id, "label": label} for game_id, label in results])
+
+
+@app.route('/api/transactions')
+@requires_manager_tenancy
+@secondary_reads
+def transactions_page_json():
+    """ JSON pages of all transactions, newest first, used by the View All Transactions table.
+    """
+    return keyset_page_json(transactionPages.get(g.tenant))
+
+
 @app.route('/autoPay', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def autopay():
     """  Processes thw autopay logic to automatically credit the manager (logged in user) with the value of the
      last played game. Form should always validate as endpoint is a post redirect from the manage_transactions page.
@@ -708,7 +1162,8 @@ def autopay():
     quick_autopay_form = formHandler.AutopayforCurrentUser()
 
     if quick_autopay_form.validate_on_submit():
-        flash_message = ourDB.add_transaction(ourDB.get_autopay_details(session[constants.PROFILE_KEY].get('name')))
+        flash_message = g.db.add_transaction(g.db.get_autopay_details(session[constants.PROFILE_KEY].get('name')))
+        tenant_data_changed()
         flash(flash_message)
         return redirect(url_for('manage_transactions'))
 
@@ -718,9 +1173,7 @@ def autopay():
 
 
 @app.route('/settings', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def manage_settings():
     """ Functionality to manage settings and similar behaviour including edit team name, export and import data, import
      google sheet data and reset DB.  The logic handles the response when changing the team name  but the other actions
@@ -730,7 +1183,7 @@ def manage_settings():
     """
     # edit team name, export and import db json for all collections\
     app.logger.debug("Got to manage_settings()")
-    our_settings = ourDB.get_app_settings()
+    our_settings = g.db.get_app_settings()
     settings_change_form = formHandler.CFFASettings(obj=our_settings)
     db_export_form = formHandler.DownloadJSON()  # just a submit button to redirect to url
     db_recovery_form = formHandler.UploadJSON()
@@ -738,8 +1191,9 @@ def manage_settings():
     delete_all_form = formHandler.DeleteAll()
 
     if settings_change_form.validate_on_submit():
-        flash_message = ourDB.update_team_name(settings_change_form.teamname.data,
+        flash_message = g.db.update_team_name(settings_change_form.teamname.data,
                                                session[constants.PROFILE_KEY].get('user_id', None))
+        tenant_data_changed()
         flash(flash_message)
         return redirect(url_for('entry_screen'))
 
@@ -749,44 +1203,67 @@ def manage_settings():
                            dbRecoveryForm=db_recovery_form,
                            dbImportGsheetForm=google_upload_form,
                            deleteAllForm=delete_all_form,
+                           jobs=jobRunner.recent(g.tenant.tenant_id),
+                           jobNames=jobs.JOB_NAMES,
                            cffauser=session[constants.PROFILE_KEY].get('name'))
 
 
 @app.route('/downloadjson', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
+@secondary_reads
 def download_json():
     """  Processes download of the DB in json format.  Form
-    should always validate as endpoint is a post redirect from the manage_settings page.
+    should always validate as endpoint is a post redirect from the manage_settings page. The zip archive is built by a
+    background job and stored with the job, the settings page shows a download link once it is ready.
 
     TO DO: Remove GET method from function.
     """
     app.logger.debug(" we got to download_json")
-    # call to extract all tables as json and place into zip to download via sendfile
-    filename = fileManager.exportarchive()
-    return send_file(filename,
-                     mimetype='application/zip',
-                     as_attachment=True)  # tell client  not to view file but download
+    db_export_form = formHandler.DownloadJSON()
+    ndjson = db_export_form.ndjson.data
+    tenant_id = g.tenant.tenant_id
+
+    def export(job, db):
+        file_manager = importExportCFFA.CFFAImportExport(db, EXPORT_DIR)
+        job.store_result(file_manager.exportstream(ndjson=ndjson, progress=job.progress),
+                         file_manager.exportfilename(),
+                         'application/zip')
+        # only the latest export of a team is kept
+        jobRunner.purge_results(tenant_id, jobs.EXPORT, job.job_id)
+        return "Export ready to download"
+
+    job_id = submit_tenant_job(jobs.EXPORT, export)
+    flash("Export started (job " + job_id + "), the download link appears below when it is ready")
+    return redirect(url_for('manage_settings'))
 
 
 @app.route('/uploadjson', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def upload_json():
-    """  Processes upload of the DB in json format.
+    """  Processes upload of the DB in json format, restoring an archive from download_json. Form should always
+    validate as endpoint is a post redirect from the manage_settings page.
 
-    TO DO: Implement. The False return value will generate an error.
+    TO DO: Remove GET method from function.
     """
     app.logger.debug("We got to upload_json()")
-    return False
+    db_recovery_form = formHandler.UploadJSON()
+    if db_recovery_form.validate_on_submit():
+        file_manager = importExportCFFA.CFFAImportExport(g.db, EXPORT_DIR)
+        try:
+            flash_message = file_manager.importarchive(db_recovery_form.selectarchivefile.data.stream, cffaStateDB)
+        except (zipfile.BadZipFile, ValueError) as e:
+            app.logger.warning("Restore failed: " + str(e))
+            flash_message = "Unable to restore archive, team data has not been changed: " + str(e)
+        tenant_data_changed()
+        flash(flash_message)
+        return redirect(url_for('entry_screen'))
+
+    flash("Unable to restore, please select a CFFA archive (.zip) file")
+    return redirect(url_for('manage_settings'))
 
 
 @app.route('/uploadGoogleConnector', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def upload_google_connector():
     """  Processes the completed google import form. Form
     should always validate as endpoint is a post redirect from the manage_settings page.
@@ -800,7 +1277,7 @@ def upload_google_connector():
     if google_upload_form.validate_on_submit():
         filename = secure_filename(google_upload_form.googlefile.data.filename)
         google_upload_form.googlefile.data.save('uploads/' + filename)
-        google_connector = importDataFromGoogle.GoogleImporter(ourDB,
+        google_connector = importDataFromGoogle.GoogleImporter(g.db,
                                                                "uploads/" + filename,
                                                                google_upload_form.sheetname.data,
                                                                google_upload_form.transactionsheetname.data,
@@ -809,9 +1286,9 @@ def upload_google_connector():
                                                                google_upload_form.summarysheetstartrow.data,
                                                                google_upload_form.summarysheetendrow.data)
 
-        flash_message = google_connector.download_data()
-        flash(flash_message)
-        return redirect(url_for('entry_screen'))
+        job_id = submit_tenant_job(jobs.GOOGLE_IMPORT, lambda job, db: google_connector.download_data(job.progress))
+        flash("Google sheet import started (job " + job_id + ")")
+        return redirect(url_for('manage_settings'))
 
     # should not get here
     app.logger.critical("Managed to get past validate on uploadGoogleCollector(). Unexpected")
@@ -819,9 +1296,7 @@ def upload_google_connector():
 
 
 @app.route('/deleteAll', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def delete_all_data():
     """  Processes the DB deletion. Form
     should always validate as endpoint is a post redirect from the manage_settings page.
@@ -834,19 +1309,57 @@ def delete_all_data():
     delete_all_form = formHandler.DeleteAll()
     if delete_all_form.validate_on_submit():
         app.logger.warning("Deleting database")
-        message = ourDB.drop_all_collections(session[constants.PROFILE_KEY].get('user_id', None))
-        flash(message)
-        return redirect(url_for('entry_screen'))
+        user_id = session[constants.PROFILE_KEY].get('user_id', None)
+
+        def delete_all(job, db):
+            try:
+                return db.drop_all_collections(user_id)
+            finally:
+                # all tenancies are dropped, not just this user's, so every cached tenancy is stale
+                tenantContexts.invalidate()
+
+        job_id = submit_tenant_job(jobs.DELETE_ALL, delete_all)
+        flash("Delete all data started (job " + job_id + ")")
+        return redirect(url_for('manage_settings'))
 
     # should not get here
     app.logger.critical("Managed to get past validate on delete_all_data(). Unexpected")
     return False
 
 
-@app.route('/manageUserAccess', methods=['GET', 'POST'])
+@app.route('/api/jobs/<job_id>')
 @requires_auth
-@requires_manager_role
-@set_tenancy
+def job_status_json(job_id):
+    """ JSON status of a background job, polled by the settings page until the job is done or failed.
+    """
+    job = job_for_session(job_id)
+    download = url_for('job_download', job_id=job_id) if job.get("result_file") is not None else None
+    return jsonify(id=job_id,
+                   kind=job.get("kind"),
+                   status=job.get("status"),
+                   progress=job.get("progress"),
+                   message=job.get("message"),
+                   download=download)
+
+
+@app.route('/jobs/<job_id>/download')
+@requires_auth
+def job_download(job_id):
+    """ Streams the output of a finished background job (an export archive) from the job store.
+    """
+    result = jobRunner.open_result(job_for_session(job_id))
+    if result is None:
+        abort(404)
+
+    return Response(result,
+                    mimetype=result.content_type,
+                    # tell client not to view file but download
+                    headers={'Content-Disposition': 'attachment; filename=' + result.filename,
+                             'Content-Length': str(result.length)})
+
+
+@app.route('/manageUserAccess', methods=['GET', 'POST'])
+@requires_manager_tenancy
 def manage_user_access():
     """ Functionality to manage user access including adding users and editing users. The logic handles the response
     when adding a new user but editing user is redirected to that endpoint via the form action setting in the
@@ -854,17 +1367,18 @@ def manage_user_access():
 
     """
     app.logger.debug("Got to manage_user_access()")
-    user_access_data = ourDB.get_user_access_data(session[constants.PROFILE_KEY].get('user_id', None))
+    user_access_data = g.db.get_user_access_data(session[constants.PROFILE_KEY].get('user_id', None))
     add_access_form = formHandler.AddAccess()
     select_edit_user_access_form = formHandler.SelectEditUserAccess(obj=user_access_data)
     select_edit_user_access_form.edituser.choices = formHandler.create_labels_for_users(user_access_data)
 
     # select_edit_user_access_form and SelectRevokeUserAccessForm redirect to different urls
     if add_access_form.validate_on_submit():
-        flash_message = ourDB.add_user_access(add_access_form.name.data,
+        flash_message = g.db.add_user_access(add_access_form.name.data,
                                               add_access_form.authid.data,
                                               add_access_form.type.data,
                                               session[constants.PROFILE_KEY].get('user_id', None))
+        tenantContexts.invalidate(add_access_form.authid.data)
         flash(flash_message)
         return redirect(url_for('manage_user_access'))
 
@@ -876,9 +1390,7 @@ def manage_user_access():
 
 
 @app.route('/editSelectUser', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def edit_select_user():
     """  Renders and processes the edit User form for user access. Form
     should always validate as endpoint is a post redirect from the manage_user_access page.
@@ -889,7 +1401,7 @@ def edit_select_user():
     email address etc.
     """
     app.logger.debug("Got to edit_select_user()")
-    user_access_data = ourDB.get_user_access_data(session[constants.PROFILE_KEY].get('user_id', None))
+    user_access_data = g.db.get_user_access_data(session[constants.PROFILE_KEY].get('user_id', None))
     add_access_form = formHandler.AddAccess()
     select_edit_user_access_form = formHandler.SelectEditUserAccess(obj=user_access_data)
     select_edit_user_access_form.edituser.choices = formHandler.create_labels_for_users(user_access_data)
@@ -904,9 +1416,7 @@ def edit_select_user():
 
 
 @app.route('/editUserAccess/<int:user>', methods=['GET', 'POST'])
-@requires_auth
-@requires_manager_role
-@set_tenancy
+@requires_manager_tenancy
 def edit_user_access(user):
     """  Renders and post processes the edit user access  form for the selected user.
 
@@ -917,16 +1427,18 @@ def edit_user_access(user):
 
     """
     app.logger.debug('Entering edit_user_access')
-    user_access_data = ourDB.get_user_access_data(session[constants.PROFILE_KEY].get('user_id', None))
+    user_access_data = g.db.get_user_access_data(session[constants.PROFILE_KEY].get('user_id', None))
     # ourUsers = dict(user_access_data)  # so we can turn index numbers into keys
-    # user_data = ourDB.getUserAccessDefaultsForEdit(ourUsers.get(user))
+    # user_data = g.db.getUserAccessDefaultsForEdit(ourUsers.get(user))
     user_data = user_access_data[user]  # should return footballClasses user object
 
     edit_user_access_form = formHandler.EditUserAccess(obj=user_data)
 
     if edit_user_access_form.validate_on_submit():
-        message = ourDB.edit_user_access(user_data.name,
+        message = g.db.edit_user_access(user_data.name,
                                          formHandler.edit_user_access_form_to_football(edit_user_access_form))
+        tenantContexts.invalidate(getattr(user_data, "authid", None))  # None clears all, safe if authid is unknown
+        tenantContexts.invalidate(edit_user_access_form.authid.data)
         flash(message)
         return redirect(url_for('manage_user_access'))
 
@@ -937,24 +1449,26 @@ def edit_user_access(user):
 @app.route('/playerSummary')
 @requires_auth
 @set_tenancy
+@conditional_page
+@secondary_reads
 def player_summary_only():
     """  Processes the page for player role users. This offers no form functionality but summary data of their accounts,
     game activity and other stats. Also provides a bank statement style transaction view since they started playing.
 
     """
-    if not ourDB.load_team_tables_for_user_id(session[constants.PROFILE_KEY].get('user_id', None)):
-        # this should not happen as this redirect page only occurs if the user_id exists already and is
-        # marked as a player as safety lets redirect to logout!
-        app.logger.critical("User has gone to player Summary without valid userID")
-        return redirect(url_for('logout'))
-
     app.logger.debug('Rendering playerSummary.html')
-    return render_template("playerSummary.html",
-                           summary=ourDB.get_summary_for_player(session[constants.PROFILE_KEY].get('name', None)),
-                           ledger=ourDB.calc_ledger_for_player(session[constants.PROFILE_KEY].get('name', None)),
-                           recentGames=ourDB.get_games_for_player(session[constants.PROFILE_KEY].get('name', None)),
+    # the reads are independent, so they are made concurrently
+    read_db = g.tenant.read_db
+    player = session[constants.PROFILE_KEY].get('name', None)
+    summary, ledger, games = reads.gather(lambda: read_db.get_summary_for_player(player),
+                                          lambda: read_db.calc_ledger_for_player(player),
+                                          lambda: read_db.get_games_for_player(player))
+    return stream_template("playerSummary.html",
+                           summary=summary,
+                           ledger=viewModels.ledger_rows(ledger),
+                           recentGames=viewModels.game_rows(games),
                            cffauser=session[constants.PROFILE_KEY].get('name'))
 
 
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=env.get('PORT', 5000))
+    create_app().run(host='0.0.0.0', port=env.get('PORT', 5000))
@@ -0,0 +1,37 @@
+/* CFFA typeahead game picker. The form holds a search box (.game-search), a result list (.game-results) and the
+   hidden game field. As the manager types a date (yyyy/m/d) or player name the matching games are fetched from the
+   search endpoint, and choosing one stores its ID in the hidden field. */
+function cffaGamePicker(form, url) {
+    var $form = $(form);
+    var $search = $form.find('.game-search');
+    var $results = $form.find('.game-results');
+    var $game = $form.find('input[name="game"]');
+    var timer = null;
+    var latest = 0;
+
+    var show = function () {
+        var request = ++latest;
+        $.getJSON(url, { q: $search.val() }, function (page) {
+            if (request !== latest) {
+                return; // a newer search has been sent
+            }
+            $results.empty();
+            $.each(page.results, function (i, game) {
+                $('<button type="button" class="list-group-item list-group-item-action">')
+                    .text(game.label)
+                    .click(function () {
+                        $game.val(game.id);
+                        $search.val(game.label);
+                        $results.empty();
+                    })
+                    .appendTo($results);
+            });
+        });
+    };
+
+    $search.on('input focus', function () {
+        $game.val('');
+        clearTimeout(timer);
+        timer = setTimeout(show, 200);
+    });
+}
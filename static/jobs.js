@@ -0,0 +1,25 @@
+/* CFFA background job status. Each row of the jobs table carries its status URL in data-status-url. Rows of jobs that
+   are still queued or running are polled until the job is done or failed, and a download link is shown for jobs
+   with output such as an export. */
+function cffaJobs(table, interval) {
+    $(table).find('tr[data-status-url]').each(function () {
+        var $row = $(this);
+        var poll = function () {
+            $.getJSON($row.data('status-url'), function (job) {
+                $row.find('.job-status').text(job.status);
+                $row.find('.job-progress').text(job.progress + '%');
+                $row.find('.job-message').text(job.message);
+                if (job.download) {
+                    $row.find('.job-download').html($('<a>').attr('href', job.download).text('Download'));
+                }
+                if (job.status === 'queued' || job.status === 'running') {
+                    setTimeout(poll, interval);
+                }
+            });
+        };
+        var status = $row.find('.job-status').text();
+        if (status === 'queued' || status === 'running') {
+            setTimeout(poll, interval);
+        }
+    });
+}
@@ -0,0 +1,27 @@
+/* CFFA keyset pager. Tables are rendered with their first page only; the Load more button fetches the next page
+   from the table's JSON endpoint and appends the rows to the DataTable. The button carries the cursor for the next
+   page in data-next and is hidden once the last page has been loaded. The JSON cells are plain text (team, player
+   and transaction names are user input), so they are escaped before DataTables writes them into the table; the rows
+   rendered by the template are already escaped by Jinja. */
+function cffaPager(table, button, url) {
+    var $button = $(button);
+    var text = $.fn.dataTable.render.text().display;
+    if (!$button.data('next')) {
+        $button.hide();
+        return;
+    }
+    $button.click(function () {
+        $button.prop('disabled', true);
+        $.getJSON(url, { after: $button.data('next') }, function (page) {
+            table.rows.add(page.rows.map(function (row) {
+                return row.map(function (cell) { return text(cell); });
+            })).draw(false);
+            $button.data('next', page.next);
+            if (!page.next) {
+                $button.hide();
+            }
+        }).always(function () {
+            $button.prop('disabled', false);
+        });
+    });
+}
@@ -0,0 +1,241 @@
+""" Minified, fingerprinted and precompressed static asset bundles for CFFA.
+
+Every page used to load the unminified bootstrap.css, jquery-3.5.1.js and bootstrap.bundle.js plus its own scripts
+from static/ individually, revalidating each on repeat visits. The build step below concatenates and minifies them into
+a few bundles, names each bundle after a hash of its content and writes .gz and .br variants beside it, together with a
+manifest mapping bundle names to the hashed file names:
+
+static/dist/cffa.3f9c1e2a7b4d.js, static/dist/cffa.3f9c1e2a7b4d.js.gz, static/dist/cffa.3f9c1e2a7b4d.js.br, ...
+static/dist/manifest.json
+
+As a file name changes whenever its content does, bundles can be served with a far future, immutable Cache-Control
+and browsers only fetch them again after a deployment changes them. Templates refer to bundles by name with
+asset_url('cffa.js'), which resolves the hashed file name from the manifest.
+
+Run the build as part of the container build, from the CFFA directory:
+
+python staticAssets.py
+
+The server also builds the bundles at startup if the manifest is missing or older than a source. Minifying requires rjsmin and rcssmin, and
+the .br variants require Brotli. Without them bundles are written unminified and without .br variants.
+
+"""
+
+import os
+import io
+import re
+import sys
+import json
+import gzip
+import hashlib
+import logging
+
+# logging config
+logger = logging.getLogger("cffa_static_assets")
+logger.setLevel(logging.DEBUG)
+# console handler
+ch = logging.StreamHandler()
+ch.setLevel(logging.DEBUG)
+formatting = logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+ch.setFormatter(formatting)
+logger.addHandler(ch)
+
+try:
+    import rjsmin
+    import rcssmin
+except ImportError:
+    rjsmin = None
+    rcssmin = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+
+# bundle name -> static files concatenated into it, in load order
+BUNDLES = {
+    "cffa.css": ["bootstrap.css"],
+    "cffa.js": ["jquery-3.5.1.js", "bootstrap.bundle.js", "pager.js", "gamepicker.js", "jobs.js"]
+}
+
+# encoding -> file suffix of the precompressed variant, in order of preference
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+# hashed file name of any build of a bundle, see build()
+HASHED_NAME = re.compile(r"^([A-Za-z0-9_-]+)\.[0-9a-f]{12}(\.[a-z]+)$")
+
+MIMETYPES = {
+    ".css": "text/css",
+    ".js": "application/javascript"
+}
+
+
+def _read_source(static_dir, filename):
+    with open(os.path.join(static_dir, filename), encoding="utf-8") as source:
+        lines = source.read().splitlines()
+
+    # the source maps are not bundled, so drop references to them
+    return "\n".join(line for line in lines if not line.startswith("//# sourceMappingURL="))
+
+
+def _minify(name, text):
+    if name.endswith(".js") and rjsmin is not None:
+        return rjsmin.jsmin(text)
+    if name.endswith(".css") and rcssmin is not None:
+        return rcssmin.cssmin(text)
+    return text
+
+
+def _write(path, content):
+    """ Write a file atomically, so workers building at the same time never serve a partial file. """
+    temporary = path + ".tmp" + str(os.getpid())
+    with open(temporary, "wb") as output:
+        output.write(content)
+    os.replace(temporary, path)
+
+
+def build(static_dir):
+    """ Build every bundle in BUNDLES into static_dir/dist and write its manifest.
+
+    Parameters
+    ----------
+
+    static_dir : str
+        Flask static folder holding the bundle sources.
+
+    Returns
+    -------
+
+    :dict
+        The manifest, bundle name -> hashed file name.
+
+    """
+    if rjsmin is None:
+        logger.warning("rjsmin and rcssmin are not installed, static bundles will not be minified")
+    if brotli is None:
+        logger.warning("Brotli is not installed, static bundles will not have .br variants")
+
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        # a newline and semicolon between scripts guard against sources that do not end their last statement
+        separator = "\n" if name.endswith(".css") else "\n;\n"
+        text = separator.join(_minify(name, _read_source(static_dir, source)) for source in sources)
+        content = text.encode("utf-8")
+        stem, extension = os.path.splitext(name)
+        hashed = "{}.{}{}".format(stem, hashlib.sha256(content).hexdigest()[:12], extension)
+        path = os.path.join(dist_dir, hashed)
+
+        _write(path, content)
+        compressed = io.BytesIO()
+        # mtime=0 keeps the .gz identical from build to build
+        with gzip.GzipFile(fileobj=compressed, mode="wb", compresslevel=9, mtime=0) as gz:
+            gz.write(content)
+        _write(path + ".gz", compressed.getvalue())
+        if brotli is not None:
+            _write(path + ".br", brotli.compress(content, quality=11))
+
+        manifest[name] = hashed
+        logger.info("Built " + hashed + " from " + ", ".join(sources) + " (" + str(len(content)) + " bytes)")
+
+    _write(os.path.join(dist_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+def _is_current(static_dir, manifest_path):
+    """ True when the manifest exists and is newer than every bundle source. """
+    if not os.path.exists(manifest_path):
+        return False
+    built = os.path.getmtime(manifest_path)
+    return all(os.path.getmtime(os.path.join(static_dir, source)) <= built
+               for sources in BUNDLES.values() for source in sources)
+
+
+class AssetManifest:
+    """ Resolves bundle names to their hashed files in static/dist.
+
+    Attributes
+    ----------
+
+    dist_dir : str
+        Directory holding the bundles and manifest.
+
+    files : dict
+        Bundle name -> hashed file name.
+
+    """
+
+    def __init__(self, static_dir, build_if_missing=True):
+        """ Load the manifest, building the bundles first if there is none or it is out of date.
+
+        Parameters
+        ----------
+
+        static_dir : str
+            Flask static folder.
+
+        build_if_missing : bool
+            Build the bundles when static/dist has no current manifest.
+
+        """
+        self.dist_dir = os.path.join(static_dir, DIST_DIR)
+        manifest_path = os.path.join(self.dist_dir, MANIFEST)
+        if build_if_missing and not _is_current(static_dir, manifest_path):
+            logger.info("Static bundle manifest missing or out of date, building static bundles")
+            self.files = build(static_dir)
+        elif os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as manifest:
+                self.files = json.load(manifest)
+        else:
+            self.files = {}
+
+    def filename(self, name):
+        """ Hashed file name of a bundle. Raises KeyError for an unknown bundle. """
+        return self.files[name]
+
+    def revision(self):
+        """ Digest of the current bundle file names, for validators of pages that link to them. """
+        return hashlib.sha1(json.dumps(self.files, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+    def variant(self, filename, accept_encodings):
+        """ The best file to send for a request of a hashed bundle.
+
+        Parameters
+        ----------
+
+        filename : str
+            Hashed file name as requested.
+
+        accept_encodings : werkzeug.datastructures.Accept
+            request.accept_encodings
+
+        Returns
+        -------
+
+        :tuple
+            (file name to send, Content-Encoding or None, mimetype). None if filename is not a bundle in dist_dir.
+
+        """
+        # earlier builds left in dist_dir are still served, for pages rendered before the bundles changed
+        match = HASHED_NAME.match(filename)
+        if filename not in self.files.values() and \
+                (match is None or match.group(1) + match.group(2) not in BUNDLES or
+                 not os.path.exists(os.path.join(self.dist_dir, filename))):
+            return None
+
+        mimetype = MIMETYPES.get(os.path.splitext(filename)[1], "application/octet-stream")
+        for encoding, suffix in ENCODINGS:
+            if accept_encodings[encoding] and os.path.exists(os.path.join(self.dist_dir, filename + suffix)):
+                return filename + suffix, encoding, mimetype
+
+        return filename, None, mimetype
+
+
+if __name__ == "__main__":
+    static_folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                       "static")
+    build(static_folder)
@@ -0,0 +1,312 @@
+""" Request scoped tenancy for CFFA.
+
+FootballDB holds the collections of the currently loaded tenancy as state on the object. When a single FootballDB is
+shared by every request, loading one user's tenancy switches the collections for every other request in flight, which
+is why CFFA has been restricted to a single synchronous worker.
+
+This module gives each request its own FootballDB view. A view is a shallow copy of the application FootballDB so it
+shares the MongoClient (and its thread safe connection pool) but has its own tenancy state. The user's role and loaded
+tenancy are resolved together and kept in a user_id keyed LRU cache with a TTL, so most requests resolve both from
+memory instead of the database.
+
+A context also carries a second view of the tenancy on the replica set read connection (see mongoConnection), which
+read only pages can opt in to. Requests read from the primary unless they do.
+
+Cached entries must be invalidated whenever a user's access changes. Each invalidation is also recorded in the
+tenancyInvalidations collection, which every worker process polls at most every sync_interval seconds (one small query,
+not one per request), so an access change made on one worker reaches the others within that interval rather than the
+TTL.
+
+"""
+
+import copy
+import time
+import threading
+import logging
+from datetime import datetime, timedelta
+from cachetools import TTLCache
+
+# logging config
+logger = logging.getLogger("cffa_tenantContext")
+logger.setLevel(logging.DEBUG)
+# console handler
+ch = logging.StreamHandler()
+ch.setLevel(logging.DEBUG)
+formatting = logging.Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+ch.setFormatter(formatting)
+logger.addHandler(ch)
+
+INVALIDATION_COLLECTION = "tenancyInvalidations"
+# user_id to tenant_id of teams without a team settings document
+TEAM_ID_COLLECTION = "tenantIds"
+
+
+class TenantContext:
+    """ The tenancy resolved for a CFFA user. The context is stored in flask g for the duration of a request.
+
+    Attributes
+    ----------
+
+    user_id : str
+        Auth0 user ID of the user the tenancy was resolved for.
+
+    tenant_id : str
+        Stable identifier of the tenancy (team). Users sharing a team share the same tenant_id, so this is the key
+        to use for any per-team caching.
+
+    db : dbinterface.FootballDB
+        FootballDB view with the team collections for this tenancy loaded.
+
+    player_role : bool
+        True when the user has the player role, and is therefore restricted to the player summary page.
+
+    read_db : dbinterface.FootballDB
+        FootballDB view to read the tenancy's data from. The same view as db unless the request has routed its reads
+        to the secondaries with use_secondary_reads().
+
+    """
+
+    def __init__(self, user_id, tenant_id, db, player_role=False, secondary_db=None):
+        self.user_id = user_id
+        self.tenant_id = tenant_id
+        self.db = db
+        self.player_role = player_role
+        self.read_db = db
+        self._secondary_db = secondary_db
+
+    def for_request(self):
+        """ Returns a copy of this context with its own FootballDB view so that a request can never alter the cached
+        context shared with other threads.
+
+        Returns
+        -------
+
+        :TenantContext
+        """
+        return TenantContext(self.user_id, self.tenant_id, copy.copy(self.db), self.player_role,
+                             None if self._secondary_db is None else copy.copy(self._secondary_db))
+
+    def use_secondary_reads(self):
+        """ Route the request's reads (read_db) to the read connection, if the tenancy has one. """
+        if self._secondary_db is not None:
+            self.read_db = self._secondary_db
+
+
+class TenantContextCache:
+    """ Thread safe user_id to TenantContext LRU cache with a TTL. A context carries both the role and the tenancy of
+    the user so a single lookup authorises and scopes a request.
+
+    Only successfully loaded tenancies are cached. A user without a tenancy (new manager) is looked up on each request
+    until onboarding completes, so that access granted on another worker is seen straight away.
+
+    Attributes
+    ----------
+
+    db : dbinterface.FootballDB
+        Application FootballDB. It is never loaded with a tenancy itself, only copied.
+
+    read_db : dbinterface.FootballDB
+        Application FootballDB on the replica set read connection, or None. Also only ever copied.
+
+    maxsize : int
+        Maximum number of user tenancies held before the least recently used is evicted.
+
+    ttl : int
+        Seconds before a cached tenancy is resolved from the database again.
+
+    invalidations : pymongo.collection.Collection
+        Invalidations shared by every worker process, or None to invalidate this process only.
+
+    sync_interval : int
+        Seconds between polls of the shared invalidations.
+
+    team_ids : pymongo.collection.Collection
+        Tenant IDs pinned to the users of teams without a team settings document, or None.
+
+    """
+
+    def __init__(self, db, maxsize=1024, ttl=300, read_db=None, state_database=None, sync_interval=5):
+        self.db = db
+        self.read_db = read_db
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self._contexts = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced = datetime.utcnow()
+        self._next_sync = time.monotonic() + sync_interval
+        self.invalidations = None
+        self.team_ids = None
+        if state_database is not None:
+            self.invalidations = state_database[INVALIDATION_COLLECTION]
+            self.team_ids = state_database[TEAM_ID_COLLECTION]
+            # records older than the TTL concern contexts that have expired anyway
+            self.invalidations.create_index("at", expireAfterSeconds=max(ttl, sync_interval) * 2)
+
+    def new_db_view(self):
+        """ A FootballDB view without a tenancy loaded, for operations that run before a tenancy exists (eg: adding a
+        team during onboarding).
+
+        Returns
+        -------
+
+        :dbinterface.FootballDB
+        """
+        return copy.copy(self.db)
+
+    def get(self, user_id):
+        """ Resolve the tenancy for a user, from the cache when possible.
+
+        Parameters
+        ----------
+
+        user_id : str
+            Auth0 user ID from the session.
+
+        Returns
+        -------
+
+        :TenantContext
+            Context private to the calling request, or None if the user has no tenancy.
+
+        """
+        if user_id is None:
+            return None
+
+        self._sync()
+        with self._lock:
+            context = self._contexts.get(user_id)
+
+        if context is None:
+            context = self._load(user_id)
+            if context is None:
+                return None
+            with self._lock:
+                self._contexts[user_id] = context
+
+        return context.for_request()
+
+    def is_player(self, user_id):
+        """ Cached role check for a user.
+
+        Parameters
+        ----------
+
+        user_id : str
+            Auth0 user ID from the session.
+
+        Returns
+        -------
+
+        :bool
+            True if the user has the player role.
+
+        """
+        context = self.get(user_id)
+        if context is not None:
+            return context.player_role
+
+        return bool(self.db.validate_user_as_player_role(user_id))
+
+    def invalidate(self, user_id=None):
+        """ Drop the cached tenancy for a user, or every cached tenancy when user_id is None. Call whenever a tenancy is
+        created, removed or its users are changed.
+
+        Parameters
+        ----------
+
+        user_id : str
+            Auth0 user ID, or None to clear the cache.
+
+        """
+        self._drop(user_id)
+        if self.invalidations is not None:
+            self.invalidations.insert_one({"user_id": user_id, "at": datetime.utcnow()})
+
+    def _drop(self, user_id):
+        with self._lock:
+            if user_id is None:
+                self._contexts.clear()
+            else:
+                self._contexts.pop(user_id, None)
+
+    def _sync(self):
+        """ Apply invalidations made by other processes, at most once every sync_interval seconds. """
+        if self.invalidations is None or time.monotonic() < self._next_sync or \
+                not self._sync_lock.acquire(blocking=False):
+            return
+
+        try:
+            self._next_sync = time.monotonic() + self.sync_interval
+            now = datetime.utcnow()
+            # overlap the previous poll to allow for clock differences between hosts and Mongo's millisecond dates,
+            # dropping a context twice only reloads it
+            since = self._synced - timedelta(seconds=self.sync_interval + 1)
+            for invalidation in self.invalidations.find({"at": {"$gt": since}}, {"user_id": 1}):
+                self._drop(invalidation.get("user_id"))
+            self._synced = now
+        except Exception as e:
+            logger.error("Could not read tenancy invalidations: " + getattr(e, 'message', repr(e)))
+        finally:
+            self._sync_lock.release()
+
+    def _load(self, user_id):
+        """ Loads the role and the tenancy for user_id into a new FootballDB view. """
+        db = self.new_db_view()
+        if not db.load_team_tables_for_user_id(user_id):
+            return None
+
+        player_role = bool(db.validate_user_as_player_role(user_id))
+        logger.debug("Loaded tenancy for user " + str(user_id) + ", player role: " + str(player_role))
+        secondary_db = None
+        if self.read_db is not None:
+            secondary_db = copy.copy(self.read_db)
+            # a secondary may not have a tenancy created moments ago yet, its requests read from the primary until
+            # the tenancy is loaded again
+            if not secondary_db.load_team_tables_for_user_id(user_id):
+                secondary_db = None
+
+        return TenantContext(user_id, derive_tenant_id(db, user_id, self.team_ids), db, player_role, secondary_db)
+
+
+def derive_tenant_id(db, user_id, team_ids=None):
+    """ Derive a stable tenant ID, the same for every user of the team, from a FootballDB with the tenancy loaded.
+
+    The team settings document ID is used as it does not change when the team is renamed. A team without a settings
+    document is identified by its access record instead: the lowest Auth0 ID of the team's users. That ID is pinned in
+    team_ids against every user of the team, so the tenant ID does not change when users are added later.
+
+    Parameters
+    ----------
+
+    db : dbinterface.FootballDB
+        FootballDB view with the tenancy loaded.
+
+    user_id : str
+        Auth0 user ID the tenancy was loaded for.
+
+    team_ids : pymongo.collection.Collection
+        Pinned tenant IDs, see TenantContextCache. Without it the ID is not pinned.
+
+    Returns
+    -------
+
+    :str
+    """
+    for document in db.get_team_settings():
+        if document.get("_id") is not None:
+            return str(document.get("_id"))
+
+    users = {str(user.authid) for user in db.get_user_access_data(user_id) if getattr(user, "authid", None)}
+    users.add(str(user_id))
+    if team_ids is None:
+        return "team:" + min(users)
+
+    pinned = {document["_id"]: document["tenant_id"] for document in team_ids.find({"_id": {"$in": list(users)}})}
+    # concurrent first loads of a team all compute the same ID, so pinned IDs only differ if a user was pinned under
+    # another team; the lowest is used so every user of the team still agrees
+    tenant_id = min(pinned.values()) if pinned else "team:" + min(users)
+    for user in users.difference(pinned):
+        team_ids.update_one({"_id": user}, {"$setOnInsert": {"tenant_id": tenant_id}}, upsert=True)
+    return tenant_id
@@ -0,0 +1,178 @@
+""" Benchmark of concurrent DB read fan-out and threaded serving against the serial, gunicorn -w 1 sync setup.
+
+Two parts, neither needs a DB. Reads are simulated with a fixed latency per query (--latency ms) as a round trip to
+MongoDB would take.
+
+1. Page build: the entry screen snapshot reads (5 queries) and the player summary reads (3 queries) made one after
+   the other, and fanned out with concurrentReads.ReadFanOut.
+
+2. Serving: a stand in for the player summary page (3 reads then a response) is served by gunicorn with a single
+   sync worker, as in the tutorials (gunicorn -w 1 server:app), then with the gthread worker of gunicorn.conf.py and
+   the reads fanned out. --clients concurrent clients each make --requests requests. Without gunicorn installed the
+   single threaded and threaded werkzeug servers stand in for the two workers.
+
+Run from the CFFA directory:
+
+python tests/BenchmarkFanOut.py [--latency 20] [--clients 20] [--requests 10]
+
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+import threading
+import subprocess
+import statistics
+import urllib.request
+from wsgiref.simple_server import make_server as make_wsgiref_server, WSGIRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import concurrentReads  # noqa: E402
+
+LATENCY = float(os.environ.get("BENCH_LATENCY", 20)) / 1000
+FAN_OUT = os.environ.get("BENCH_FAN_OUT", "1") == "1"
+reads = concurrentReads.ReadFanOut(8)
+
+
+def query():
+    time.sleep(LATENCY)
+    return [{"row": i} for i in range(50)]
+
+
+def player_summary_reads():
+    if FAN_OUT:
+        return reads.gather(query, query, query)
+    return [query(), query(), query()]
+
+
+def app(environ, start_response):
+    """ Stand in WSGI app for the player summary page, served by gunicorn as BenchmarkFanOut:app. """
+    body = str(player_summary_reads()).encode()
+    start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", str(len(body)))])
+    return [body]
+
+
+def time_page(build, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        build()
+    return 1000 * (time.perf_counter() - start) / repeat
+
+
+def page_build(latency):
+    global LATENCY
+    LATENCY = latency
+    serial_dashboard = time_page(lambda: [query() for _ in range(5)])
+    fan_out_dashboard = time_page(lambda: reads.gather(query, query, query, query, query))
+    serial_player = time_page(lambda: [query() for _ in range(3)])
+    fan_out_player = time_page(lambda: reads.gather(query, query, query))
+    print("Page build, {:.0f} ms per query".format(latency * 1000))
+    print("entry screen snapshot  serial {:8.1f} ms   fan-out {:8.1f} ms".format(serial_dashboard, fan_out_dashboard))
+    print("player summary         serial {:8.1f} ms   fan-out {:8.1f} ms".format(serial_player, fan_out_player))
+
+
+def load(url, clients, requests_per_client):
+    """ Requests per second and latencies (ms) of clients concurrently requesting url. """
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            urllib.request.urlopen(url).read()
+            with lock:
+                latencies.append(1000 * (time.perf_counter() - start))
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+def wait_for(url, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server at " + url + " did not start")
+
+
+def serve_gunicorn(port, worker_args, fan_out, latency):
+    environment = dict(os.environ, BENCH_LATENCY=str(latency * 1000), BENCH_FAN_OUT="1" if fan_out else "0")
+    # run from tests/ so that gunicorn does not pick up the CFFA gunicorn.conf.py
+    return subprocess.Popen([sys.executable, "-m", "gunicorn", "-b", "127.0.0.1:" + str(port)] + worker_args +
+                            ["BenchmarkFanOut:app"], env=environment, cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_werkzeug(port, threaded):
+    from werkzeug.serving import make_server
+    if threaded:
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = make_server("127.0.0.1", port, app, threaded=True)
+    else:
+        server = make_wsgiref_server("127.0.0.1", port, app, handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serving(latency, clients, requests_per_client):
+    global LATENCY, FAN_OUT
+    LATENCY = latency
+    try:
+        import gunicorn  # noqa: F401
+        have_gunicorn = True
+    except ImportError:
+        have_gunicorn = False
+
+    setups = [("gunicorn -w 1 (sync), serial reads", ["-w", "1", "-k", "sync", "--threads", "1"], False),
+              ("gunicorn gthread 32 threads, fan-out", ["-w", "1", "-k", "gthread", "--threads", "32"], True)]
+    print("Serving, {} clients x {} requests, {:.0f} ms per query{}".format(
+        clients, requests_per_client, latency * 1000, "" if have_gunicorn else " (werkzeug stand in for gunicorn)"))
+    for port, (name, worker_args, fan_out) in enumerate(setups, start=8710):
+        url = "http://127.0.0.1:{}/playerSummary".format(port)
+        if have_gunicorn:
+            process = serve_gunicorn(port, worker_args, fan_out, latency)
+        else:
+            FAN_OUT = fan_out
+            server = serve_werkzeug(port, threaded=fan_out)
+        try:
+            wait_for(url)
+            throughput, median, p95 = load(url, clients, requests_per_client)
+        finally:
+            if have_gunicorn:
+                process.terminate()
+                process.wait()
+            else:
+                server.shutdown()
+        print("{:40} {:8.1f} req/s   median {:8.1f} ms   p95 {:8.1f} ms".format(name, throughput, median, p95))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=20, help="simulated ms per query")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    arguments = parser.parse_args()
+    page_build(arguments.latency / 1000)
+    print()
+    serving(arguments.latency / 1000, arguments.clients, arguments.requests)
+
+
+if __name__ == "__main__":
+    main()
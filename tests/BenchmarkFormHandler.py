@@ -0,0 +1,175 @@
+""" Micro-benchmarks of the formHandler hot paths on large teams, with stored baselines and a regression check.
+
+Times, on synthetic inputs:
+
+- create_labels_for_games for --games games (the edit and delete game pickers),
+- create_labels_for_players for --players players, for each action, and PlayerRoster built from the same players,
+- GameDetails construction and validate() of a posted game with --rows player rows,
+- game_form_to_football of the validated form.
+
+Each benchmark reports the best per call time of --repeat runs, which is the least disturbed by other load on the
+machine. Without --save the times are compared with the baselines in BenchmarkFormHandler.json (next to this script)
+and the script exits with status 1 if any benchmark is more than --threshold times slower than its baseline, or has
+no baseline recorded for these sizes, so it can gate a deployment. Baselines are only comparable on the machine that
+recorded them: record them with --save on the machine that runs the check, and again when a slowdown is accepted.
+
+Run from the CFFA directory, no DB is required:
+
+python tests/BenchmarkFormHandler.py [--games 5000] [--players 300] [--rows 40] [--repeat 5] [--threshold 1.25]
+                                     [--save] [--baselines BenchmarkFormHandler.json]
+
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import platform
+from bson.decimal128 import Decimal128
+from bson.objectid import ObjectId
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import formHandler  # noqa: E402
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "BenchmarkFormHandler.json")
+
+
+def make_games(number_of_games, names):
+    start = datetime.datetime(2000, 1, 1)
+    games = []
+    for i in range(number_of_games):
+        squad = random.sample(names, 10)
+        games.append({"_id": ObjectId(),
+                      "Date of Game dd-MON-YYYY": start + datetime.timedelta(days=7 * i),
+                      "Players": 10,
+                      "Cost of Game": Decimal128("60.00"),
+                      "Cost Each": Decimal128("6.00"),
+                      "PlayerList": ", ".join(squad)})
+    return games
+
+
+def make_players(names):
+    return [{"playerName": name, "retiree": random.random() < 0.2, "comment": ""} for name in names]
+
+
+def game_form_data(rows, names):
+    """ Form data of a posted game with every row played and the first row booking the pitch. """
+    data = {"gamecost": "60", "gamedate": "2020-01-04", "submit": "Submit"}
+    for row, name in enumerate(random.sample(names, rows)):
+        data["playerlist-{}-playername".format(row)] = name
+        data["playerlist-{}-playedlastgame".format(row)] = "y"
+        data["playerlist-{}-guests".format(row)] = "0"
+    data["playerlist-0-pitchbooker"] = "y"
+    return data
+
+
+def best(function, number, repeat):
+    """ Best per call time in ms of repeat runs of number calls. """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return 1000 * min(times)
+
+
+def run(arguments):
+    names = ["Player " + str(i) for i in range(max(arguments.players, arguments.rows))]
+    games = make_games(arguments.games, names)
+    players = make_players(names[:arguments.players])
+
+    app = Flask(__name__)
+    app.config["SECRET_KEY"] = "benchmark"
+    app.config["WTF_CSRF_ENABLED"] = False
+    context = app.test_request_context("/newgame/" + str(arguments.rows), method="POST",
+                                       data=game_form_data(arguments.rows, names))
+    context.push()
+
+    def game_details():
+        form = formHandler.GameDetails(arguments.rows)
+        if not form.validate():
+            raise RuntimeError("benchmark game form does not validate: " + str(form.errors))
+        return form
+
+    form = game_details()
+    benchmarks = [
+        ("create_labels_for_games", lambda: formHandler.create_labels_for_games(games), 1),
+        ("create_labels_for_players allplayers",
+         lambda: formHandler.create_labels_for_players(players, "allplayers"), 20),
+        ("create_labels_for_players retire", lambda: formHandler.create_labels_for_players(players, "retire"), 20),
+        ("create_labels_for_players reactivate",
+         lambda: formHandler.create_labels_for_players(players, "reactivate"), 20),
+        ("PlayerRoster", lambda: formHandler.PlayerRoster(players), 20),
+        ("GameDetails validate", game_details, 5),
+        ("game_form_to_football", lambda: formHandler.game_form_to_football(form), 20),
+    ]
+    results = {name: best(function, number, arguments.repeat) for name, function, number in benchmarks}
+    context.pop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--players", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=40, help="player rows in the posted game form")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="fail if a benchmark takes more than this multiple of its baseline")
+    parser.add_argument("--save", action="store_true", help="record these times as the baselines")
+    parser.add_argument("--baselines", default=BASELINES)
+    arguments = parser.parse_args()
+    random.seed(0)
+
+    sizes = {"games": arguments.games, "players": arguments.players, "rows": arguments.rows}
+    results = run(arguments)
+
+    baselines = {}
+    if os.path.exists(arguments.baselines):
+        with open(arguments.baselines) as baselines_file:
+            baselines = json.load(baselines_file)
+    if baselines and baselines.get("sizes") != sizes:
+        print("Baselines were recorded for {}, not compared".format(baselines.get("sizes")))
+        baselines = {}
+
+    print("{} games, {} players, {} row game form, best of {} runs".format(arguments.games, arguments.players,
+                                                                          arguments.rows, arguments.repeat))
+    regressions = []
+    missing = []
+    for name, milliseconds in results.items():
+        baseline = baselines.get("results", {}).get(name)
+        line = "{:40} {:9.3f} ms".format(name, milliseconds)
+        if baseline:
+            ratio = milliseconds / baseline
+            line += "   baseline {:9.3f} ms   x{:5.2f}".format(baseline, ratio)
+            if ratio > arguments.threshold:
+                line += "   REGRESSION"
+                regressions.append(name)
+        else:
+            missing.append(name)
+        print(line)
+
+    if arguments.save:
+        with open(arguments.baselines, "w") as baselines_file:
+            json.dump({"sizes": sizes,
+                       "recorded": datetime.datetime.utcnow().isoformat() + "Z",
+                       "python": platform.python_version(),
+                       "machine": platform.node(),
+                       "results": results}, baselines_file, indent=2, sort_keys=True)
+        print("Baselines saved to " + arguments.baselines)
+    elif missing:
+        print("{} benchmark(s) have no baseline to compare with, record them with --save".format(len(missing)))
+        sys.exit(1)
+
+    if regressions:
+        print("{} benchmark(s) slower than {}x their baseline".format(len(regressions), arguments.threshold))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+""" Benchmark of table rendering with viewModels rows against the raw Mongo documents the templates used to format.
+
+Renders the all games and all players tables of entryScreen.html for a synthetic large team, once formatting each
+cell in the template from the raw documents (as before) and once from GameRow/SummaryRow objects. Building the rows
+is timed separately: it happens once per tenant data version in the dashboard snapshot, not on every page view.
+
+Run from the CFFA directory, no DB is required:
+
+python tests/BenchmarkViewModels.py [number of games]
+
+"""
+
+import sys
+import os
+import timeit
+import random
+import datetime
+from bson.decimal128 import Decimal128
+from bson.objectid import ObjectId
+from jinja2 import Environment
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import viewModels  # noqa: E402
+
+RAW_TEMPLATE = """
+{% for game in games %}<tr>
+<td>{{ game.get("Date of Game dd-MON-YYYY").year }}/{{ game.get("Date of Game dd-MON-YYYY").month }}/{{ game.get("Date of Game dd-MON-YYYY").day }}</td>
+<td>{{ game.get("Players") }}</td>
+<td>£{{ game.get("Cost of Game").to_decimal()|round(2) }}</td>
+<td>£{{ game.get("Cost Each").to_decimal()|round(2) }}</td>
+<td>{{ game.get("PlayerList") }}</td>
+</tr>{% endfor %}
+{% for player in players %}<tr>
+<td>{{ player.get("playerName") }}</td>
+<td>£{{ (player.get("balance").to_decimal()|round(2)) }}</td>
+<td>{{ player.get("gamesAttended") }}</td>
+<td>{{ player.get("lastPlayed").year }}/{{ player.get("lastPlayed").month }}/{{ player.get("lastPlayed").day }}</td>
+<td>£{{ (player.get("moniespaid").to_decimal()|round(2)) }}</td>
+<td>£{{ (player.get("gamesCost").to_decimal()|round(2)) }}</td>
+</tr>{% endfor %}
+"""
+
+ROW_TEMPLATE = """
+{% for game in games %}<tr>
+<td>{{ game.date }}</td>
+<td>{{ game.players }}</td>
+<td>{{ game.cost }}</td>
+<td>{{ game.cost_each }}</td>
+<td>{{ game.player_list }}</td>
+</tr>{% endfor %}
+{% for player in players %}<tr>
+<td>{{ player.name }}</td>
+<td>{{ player.balance }}</td>
+<td>{{ player.attended }}</td>
+<td>{{ player.last_played }}</td>
+<td>{{ player.paid }}</td>
+<td>{{ player.cost }}</td>
+</tr>{% endfor %}
+"""
+
+
+def make_team(number_of_games, number_of_players=40):
+    names = ["Player " + str(i) for i in range(number_of_players)]
+    start = datetime.datetime(2010, 1, 1)
+    games = []
+    for i in range(number_of_games):
+        squad = random.sample(names, 10)
+        games.append({"_id": ObjectId(),
+                      "Date of Game dd-MON-YYYY": start + datetime.timedelta(days=7 * i),
+                      "Players": 10,
+                      "Cost of Game": Decimal128("60.00"),
+                      "Cost Each": Decimal128("6.00"),
+                      "PlayerList": ", ".join(squad)})
+    players = [{"playerName": name,
+                "balance": Decimal128(str(random.randint(-5000, 5000) / 100)),
+                "gamesAttended": random.randint(0, number_of_games),
+                "lastPlayed": start,
+                "moniespaid": Decimal128(str(random.randint(0, 100000) / 100)),
+                "gamesCost": Decimal128(str(random.randint(0, 100000) / 100))} for name in names]
+    return games, players
+
+
+def main():
+    number_of_games = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = 20
+    games, players = make_team(number_of_games)
+    env = Environment(autoescape=True)
+    raw_template = env.from_string(RAW_TEMPLATE)
+    row_template = env.from_string(ROW_TEMPLATE)
+
+    build = timeit.timeit(lambda: (viewModels.game_rows(games), viewModels.summary_rows(players)), number=repeat)
+    game_rows = viewModels.game_rows(games)
+    summary_rows = viewModels.summary_rows(players)
+    raw = timeit.timeit(lambda: raw_template.render(games=games, players=players), number=repeat)
+    rows = timeit.timeit(lambda: row_template.render(games=game_rows, players=summary_rows), number=repeat)
+
+    print("{} games, {} players, mean of {} renders".format(number_of_games, len(players), repeat))
+    print("render from raw documents : {:8.2f} ms".format(1000 * raw / repeat))
+    print("render from view models   : {:8.2f} ms".format(1000 * rows / repeat))
+    print("build view models (once)  : {:8.2f} ms".format(1000 * build / repeat))
+    print("render speed up           : {:8.1f}x".format(raw / rows))
+
+
+if __name__ == "__main__":
+    main()
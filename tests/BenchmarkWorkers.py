@@ -0,0 +1,133 @@
+""" Benchmark of requests per second against the number of gunicorn workers, with the server.create_app() pattern.
+
+The stand in app below is built the way server.py now is: create_app() compiles the templates (in the gunicorn
+master with --preload) and each worker opens its own backend after the fork, on its first request. A page waits on a
+simulated DB read (--latency ms) and renders a games table with the compiled template. The app is served with
+gunicorn --preload 'BenchmarkWorkers:create_app()' and sync workers, for each worker count in --workers, and each
+response reports the worker's process ID and the process that opened its backend, to check that no worker uses a
+backend opened before the fork.
+
+Requires gunicorn. Run from the CFFA directory, no DB is required:
+
+python tests/BenchmarkWorkers.py [--workers 1 2 4] [--clients 16] [--requests 20] [--latency 20]
+
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, render_template_string
+
+TEMPLATE = """<table>{% for game in games %}<tr><td>{{ game.date }}</td><td>{{ game.players }}</td>
+<td>{{ game.cost }}</td><td>{{ game.player_list }}</td></tr>{% endfor %}</table>"""
+
+LATENCY = float(os.environ.get("BENCH_LATENCY", 20)) / 1000
+GAMES = [{"date": "2020/1/" + str(i % 28 + 1), "players": 10, "cost": "£60.00",
+          "player_list": ", ".join("Player " + str(p) for p in range(10))} for i in range(100)]
+
+app = Flask(__name__)
+_backend_pid = None
+_backend_pool = None
+_backend_lock = threading.Lock()
+
+
+def init_backend():
+    """ Stand in for server.init_backend: state that must not be shared across a fork, opened once per process. """
+    global _backend_pid, _backend_pool
+    with _backend_lock:
+        if _backend_pid != os.getpid():
+            _backend_pool = ThreadPoolExecutor(max_workers=4)
+            _backend_pid = os.getpid()
+
+
+@app.before_request
+def open_backend():
+    if _backend_pid != os.getpid():
+        init_backend()
+
+
+@app.route("/cffa")
+def entry_screen():
+    games = _backend_pool.submit(lambda: time.sleep(LATENCY) or GAMES).result()
+    return render_template_string(TEMPLATE, games=games) + \
+        "<!-- {} {} -->".format(os.getpid(), _backend_pid)
+
+
+def create_app():
+    app.jinja_env.from_string(TEMPLATE)
+    return app
+
+
+def load(url, clients, requests_per_client):
+    """ Requests per second, and the (worker, backend) process IDs seen. """
+    seen = set()
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(requests_per_client):
+            body = urllib.request.urlopen(url).read().decode()
+            worker, backend = body.rsplit("<!-- ", 1)[1].split(" -->")[0].split()
+            with lock:
+                seen.add((worker, backend))
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return clients * requests_per_client / (time.perf_counter() - start), seen
+
+
+def wait_for(url, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server at " + url + " did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--latency", type=float, default=20, help="simulated DB ms per request")
+    arguments = parser.parse_args()
+
+    print("{} clients x {} requests, {:.0f} ms DB wait per request, {} CPUs".format(
+        arguments.clients, arguments.requests, arguments.latency, os.cpu_count()))
+    baseline = None
+    for port, workers in enumerate(arguments.workers, start=8720):
+        environment = dict(os.environ, BENCH_LATENCY=str(arguments.latency))
+        # run from tests/ so that gunicorn does not pick up the CFFA gunicorn.conf.py
+        process = subprocess.Popen([sys.executable, "-m", "gunicorn", "-b", "127.0.0.1:" + str(port), "--preload",
+                                    "-k", "sync", "--threads", "1", "-w", str(workers),
+                                    "BenchmarkWorkers:create_app()"],
+                                   env=environment, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        url = "http://127.0.0.1:{}/cffa".format(port)
+        try:
+            wait_for(url)
+            throughput, seen = load(url, arguments.clients, arguments.requests)
+        finally:
+            process.terminate()
+            process.wait()
+
+        baseline = baseline or throughput
+        fork_safe = all(worker == backend for worker, backend in seen)
+        print("-w {:<3} {:8.1f} req/s   x{:4.1f}   workers seen {}   backend opened per worker: {}".format(
+            workers, throughput, throughput / baseline, len(seen), "yes" if fork_safe else "NO"))
+
+
+if __name__ == "__main__":
+    main()
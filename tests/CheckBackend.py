@@ -0,0 +1,84 @@
+""" Start up check of server.init_backend(), the code each gunicorn worker runs from post_fork.
+
+Imports server.py as gunicorn --preload does, calls create_app() and then init_backend() in this process and in a
+forked child, as the post_fork hook of gunicorn.conf.py does for each worker. Checks that every shared cache and
+pool has been opened by the process using it, and that a request is served. init_backend() exits the process when
+the backend cannot be opened, which this check reports as a failure rather than the silent worker exits gunicorn
+would show.
+
+Needs cffadb, and a mongod configured with the BACKEND_* variables or mongomock with --mongomock. Exits with status 1
+if the check fails. Run from the CFFA directory:
+
+python tests/CheckBackend.py [--mongomock]
+
+"""
+
+import os
+import sys
+import argparse
+
+CFFA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CFFA_DIR)
+
+# Auth0 is never contacted, but server.py needs its settings to import
+for variable, default in [("AUTH0_DOMAIN", "check.invalid"), ("AUTH0_CLIENT_ID", "check"),
+                          ("AUTH0_CLIENT_SECRET", "check"), ("AUTH0_CALLBACK_URL", "http://localhost/callback"),
+                          ("AUTH0_AUDIENCE", "https://check.invalid/userinfo"), ("SECRET_KEY", "check"),
+                          ("EXPORTDIRECTORY", "/tmp")]:
+    os.environ.setdefault(variable, default)
+
+BACKEND = ["ourDB", "ourReadDB", "tenantContexts", "cffaStateDB", "tenantVersions", "reads", "dashboards", "gameLabels",
+           "transactionPages", "jobRunner"]
+
+
+def check_backend(server):
+    """ Problems with the backend of this process, as a list of messages. """
+    try:
+        server.init_backend()
+    except SystemExit:
+        return ["init_backend() exited, see the CFFA log for the cause"]
+
+    problems = ["init_backend() did not set " + name for name in BACKEND if getattr(server, name, None) is None]
+    if server._backend_pid != os.getpid():
+        problems.append("backend opened by process {} not {}".format(server._backend_pid, os.getpid()))
+    response = server.app.test_client().get("/")
+    if response.status_code != 200:
+        problems.append("GET / returned HTTP " + str(response.status_code))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongomock", action="store_true", help="use mongomock instead of a mongod")
+    arguments = parser.parse_args()
+    if arguments.mongomock:
+        import pymongo
+        import mongomock
+        import mongomock.gridfs
+        mongomock.gridfs.enable_gridfs_integration()
+        pymongo.MongoClient = mongomock.MongoClient
+
+    os.chdir(CFFA_DIR)
+    import server
+    server.create_app()
+
+    problems = check_backend(server)
+    # a worker forked from a master that has opened its backend must open its own
+    child = os.fork()
+    if child == 0:
+        child_problems = check_backend(server)
+        for problem in child_problems:
+            print("forked worker: " + problem)
+        os._exit(1 if child_problems else 0)
+    _, status = os.waitpid(child, 0)
+
+    for problem in problems:
+        print("master: " + problem)
+    if problems or status != 0:
+        print("init_backend check FAILED")
+        sys.exit(1)
+    print("init_backend check passed in the master and a forked worker")
+
+
+if __name__ == "__main__":
+    main()
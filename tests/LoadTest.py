@@ -0,0 +1,370 @@
+""" Route level load test of the CFFA web server.
+
+Drives the routes of server.py in process through Flask test clients, with concurrent virtual users, and reports the
+throughput and p50/p95/p99 latency of each route. Results are also written as JSON so runs can be compared between
+versions (--compare).
+
+Identity: Auth0 is not contacted. Each virtual user gets a session as the Auth0 callback would leave it
+(constants.PROFILE_KEY with user_id and name), as a manager of one of the load test teams, or as a player of it
+for /playerSummary. CSRF checks are disabled so the harness can post forms.
+
+Database: by default a local mongod, configured with the BACKEND_* variables exactly as for the server. Use a
+database dedicated to load testing (BACKEND_DBNAME) as the harness adds teams, games and transactions to it. With
+--mongomock the harness runs against mongomock's in memory stand in instead (pip install mongomock), which needs no
+mongod but does not reflect real DB latency.
+
+Setup adds --teams teams through the routes themselves (onboarding, new game, new transaction, user access), each
+with --games games and --transactions transactions. The load phase then runs --users virtual users for --duration
+seconds, each picking routes at random by their weight in ROUTES.
+
+Not driven: /login, /callback and /logout (Auth0 redirects), /deleteAll, /uploadjson and /uploadGoogleConnector
+(replace the team's data or need Google credentials), and the apply steps of deleting games and editing users.
+
+Run from the CFFA directory:
+
+python tests/LoadTest.py [--users 8] [--duration 30] [--teams 4] [--games 100] [--transactions 100]
+                         [--conditional] [--mongomock] [--output loadtest.json] [--compare previous.json]
+
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import threading
+import subprocess
+
+CFFA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CFFA_DIR)
+
+# Auth0 is never contacted, but server.py needs its settings to import
+for variable, default in [("AUTH0_DOMAIN", "loadtest.invalid"), ("AUTH0_CLIENT_ID", "loadtest"),
+                          ("AUTH0_CLIENT_SECRET", "loadtest"), ("AUTH0_CALLBACK_URL", "http://localhost/callback"),
+                          ("AUTH0_AUDIENCE", "https://loadtest.invalid/userinfo"), ("SECRET_KEY", "loadtest"),
+                          ("EXPORTDIRECTORY", "/tmp")]:
+    os.environ.setdefault(variable, default)
+
+PLAYERS_PER_GAME = 6
+SQUAD = ["Player " + str(number) for number in range(1, 16)]
+
+
+class Route:
+    """ A route driven by the load test.
+
+    Attributes
+    ----------
+
+    name : str
+        Name the route is reported under.
+
+    method : str
+        GET or POST
+
+    path : callable
+        path(team) returns the URL to request for a LoadTestTeam.
+
+    data : callable
+        data(team) returns the form data to post, or None.
+
+    weight : int
+        Relative frequency of the route in the load mix.
+
+    player : bool
+        Requested with the team's player session rather than the manager's.
+
+    """
+
+    def __init__(self, name, method, path, weight, data=None, player=False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.weight = weight
+        self.data = data
+        self.player = player
+
+
+class LoadTestTeam:
+    """ A team added by the setup phase, with the IDs the routes need. """
+
+    def __init__(self, number, run_id):
+        self.number = number
+        self.name = "Load Test {} {}".format(run_id, number)
+        self.manager = {"user_id": "loadtest|manager-{}-{}".format(run_id, number), "name": "Manager " + str(number)}
+        self.player = {"user_id": "loadtest|player-{}-{}".format(run_id, number), "name": SQUAD[0]}
+        self.game_ids = []
+        self.player_choices = []
+        self.job_id = None
+        self.next_date = datetime.date(2015, 1, 3)
+
+    def game_form(self):
+        """ Form data of a new game on the next free Saturday. """
+        players = random.sample(SQUAD, PLAYERS_PER_GAME)
+        data = {"gamecost": "60", "gamedate": self.next_date.strftime("%Y-%m-%d"), "submit": "Submit"}
+        self.next_date += datetime.timedelta(days=7)
+        for row in range(10):
+            data["playerlist-{}-guests".format(row)] = "0"
+            if row < len(players):
+                data["playerlist-{}-playername".format(row)] = players[row]
+                data["playerlist-{}-playedlastgame".format(row)] = "y"
+        data["playerlist-0-pitchbooker"] = "y"
+        return data
+
+    def transaction_form(self):
+        return {"player": str(random.choice(self.player_choices)),
+                "transactiondate": datetime.date.today().strftime("%Y-%m-%d"),
+                "amount": str(random.choice([5, 10, 20])),
+                "type": "Load test payment",
+                "submittrans": "Add Transaction"}
+
+    def game_id(self):
+        return random.choice(self.game_ids)
+
+
+ROUTES = [
+    Route("GET /", "GET", lambda team: "/", 1),
+    Route("GET /dashboard", "GET", lambda team: "/dashboard", 1),
+    Route("GET /cffa", "GET", lambda team: "/cffa", 10),
+    Route("GET /games", "GET", lambda team: "/games", 5),
+    Route("GET /newgame/<n>", "GET", lambda team: "/newgame/" + str(PLAYERS_PER_GAME), 3),
+    Route("POST /newgame/<n>", "POST", lambda team: "/newgame/" + str(PLAYERS_PER_GAME), 1,
+          data=lambda team: team.game_form()),
+    Route("GET /applyEditGame/<id>", "GET", lambda team: "/applyEditGame/" + team.game_id(), 2),
+    Route("GET /applyDeletegame/<id>", "GET", lambda team: "/applyDeletegame/" + team.game_id(), 1),
+    Route("GET /players", "GET", lambda team: "/players", 3),
+    Route("GET /editSelectPlayer", "GET", lambda team: "/editSelectPlayer", 1),
+    Route("GET /transactions", "GET", lambda team: "/transactions", 8),
+    Route("POST /transactions", "POST", lambda team: "/transactions", 1, data=lambda team: team.transaction_form()),
+    Route("GET /api/games", "GET", lambda team: "/api/games", 3),
+    Route("GET /api/games/search", "GET", lambda team: "/api/games/search?q=" + random.choice(["2015", "play", "p"]),
+          3),
+    Route("GET /api/transactions", "GET", lambda team: "/api/transactions", 3),
+    Route("GET /autoPay", "GET", lambda team: "/autoPay", 1),
+    Route("GET /settings", "GET", lambda team: "/settings", 2),
+    Route("POST /downloadjson", "POST", lambda team: "/downloadjson", 1,
+          data=lambda team: {"submitdownload": "Download DB archive"}),
+    Route("GET /api/jobs/<id>", "GET", lambda team: "/api/jobs/" + team.job_id, 1),
+    Route("GET /manageUserAccess", "GET", lambda team: "/manageUserAccess", 1),
+    Route("GET /playerSummary", "GET", lambda team: "/playerSummary", 10, player=True),
+    Route("GET /favicon.ico", "GET", lambda team: "/favicon.ico", 1),
+]
+
+
+def use_mongomock():
+    """ Replace pymongo's client with mongomock's before server.py and cffadb are imported. """
+    import pymongo
+    import mongomock
+    import mongomock.gridfs
+    mongomock.gridfs.enable_gridfs_integration()
+    pymongo.MongoClient = mongomock.MongoClient
+
+
+def load_server():
+    os.chdir(CFFA_DIR)
+    import server
+    server.app.config["WTF_CSRF_ENABLED"] = False
+    server.app.config["TESTING"] = True
+    return server
+
+
+def client_for(app, user):
+    """ Flask test client with the session left by an Auth0 login of user. """
+    import constants
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session[constants.JWT_PAYLOAD] = {"sub": user["user_id"], "name": user["name"]}
+        session[constants.PROFILE_KEY] = {"user_id": user["user_id"], "name": user["name"], "picture": ""}
+    return client
+
+
+def check(response, what):
+    if response.status_code >= 400:
+        raise RuntimeError(what + " failed with HTTP " + str(response.status_code) + ": " +
+                           response.get_data(as_text=True)[:300])
+
+
+def set_up_team(app, team, games, transactions):
+    """ Add a team and its data through the routes, as a manager would. """
+    manager = client_for(app, team.manager)
+    check(manager.post("/onboarding", data={"teamname": team.name, "submitnewteam": "Next"}), "onboarding")
+    for _ in range(games):
+        check(manager.post("/newgame/" + str(PLAYERS_PER_GAME), data=team.game_form()), "new game")
+
+    page = manager.get("/transactions").get_data(as_text=True)
+    select = re.search(r'<select[^>]*name="player"[^>]*>(.*?)</select>', page, re.S)
+    team.player_choices = [int(value) for value in re.findall(r'value="(-?\d+)"', select.group(1))] if select else []
+    if not team.player_choices:
+        raise RuntimeError("no players found on the transactions page of " + team.name)
+    for _ in range(transactions):
+        check(manager.post("/transactions", data=team.transaction_form()), "new transaction")
+
+    check(manager.post("/manageUserAccess", data={"name": team.player["name"], "authid": team.player["user_id"],
+                                                  "type": "Player", "submitaddaccess": "Add User"}), "user access")
+    results = manager.get("/api/games/search?q=&limit=50").get_json()
+    team.game_ids = [result["id"] for result in results["results"]]
+    if not team.game_ids:
+        raise RuntimeError("no games found for " + team.name)
+
+    # an export job to poll, its ID is flashed on the settings page
+    check(manager.post("/downloadjson", data={"submitdownload": "Download DB archive"}), "export")
+    job = re.search(r"job ([0-9a-f]{32})", manager.get("/settings").get_data(as_text=True))
+    if job is None:
+        raise RuntimeError("no export job started for " + team.name)
+    team.job_id = job.group(1)
+
+
+def percentile(ordered, fraction):
+    """ Nearest rank percentile of a sorted list. """
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+class VirtualUser(threading.Thread):
+    """ Requests random routes for one team until the deadline, recording the latency of each. """
+
+    def __init__(self, app, team, deadline, results, lock, conditional):
+        threading.Thread.__init__(self, daemon=True)
+        self.manager = client_for(app, team.manager)
+        self.player = client_for(app, team.player)
+        self.team = team
+        self.deadline = deadline
+        self.results = results
+        self.lock = lock
+        self.conditional = conditional
+        self.etags = {}
+
+    def run(self):
+        weights = [route.weight for route in ROUTES]
+        while time.time() < self.deadline:
+            route = random.choices(ROUTES, weights)[0]
+            client = self.player if route.player else self.manager
+            path = route.path(self.team)
+            headers = {}
+            if self.conditional and route.method == "GET" and path in self.etags:
+                headers["If-None-Match"] = self.etags[path]
+            data = route.data(self.team) if route.data else None
+
+            start = time.perf_counter()
+            response = client.open(path, method=route.method, data=data, headers=headers)
+            # the whole body, streamed pages included
+            response.get_data()
+            elapsed = 1000 * (time.perf_counter() - start)
+
+            if response.headers.get("ETag"):
+                self.etags[path] = response.headers["ETag"]
+            with self.lock:
+                result = self.results[route.name]
+                result["latencies"].append(elapsed)
+                result["statuses"][str(response.status_code)] = result["statuses"].get(str(response.status_code), 0) + 1
+                if response.status_code >= 400:
+                    result["errors"] += 1
+
+
+def summarise(results, elapsed):
+    routes = {}
+    for name, result in results.items():
+        ordered = sorted(result["latencies"])
+        routes[name] = {"requests": len(ordered),
+                        "errors": result["errors"],
+                        "statuses": result["statuses"],
+                        "throughput": len(ordered) / elapsed,
+                        "mean_ms": sum(ordered) / len(ordered) if ordered else None,
+                        "p50_ms": percentile(ordered, 0.50),
+                        "p95_ms": percentile(ordered, 0.95),
+                        "p99_ms": percentile(ordered, 0.99)}
+    return routes
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=CFFA_DIR).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report, previous=None):
+    def value(number):
+        return "{:9.1f}".format(number) if number is not None else "        -"
+
+    print("{:28} {:>8} {:>6} {:>9} {:>9} {:>9} {:>9}{}".format(
+        "route", "requests", "errors", "req/s", "p50 ms", "p95 ms", "p99 ms", "   p95 vs previous" if previous else ""))
+    for name in sorted(report["routes"]):
+        route = report["routes"][name]
+        line = "{:28} {:8} {:6} {} {} {} {}".format(name, route["requests"], route["errors"], value(route["throughput"]),
+                                                     value(route["p50_ms"]), value(route["p95_ms"]),
+                                                     value(route["p99_ms"]))
+        before = (previous or {}).get("routes", {}).get(name, {}).get("p95_ms")
+        if before and route["p95_ms"]:
+            line += "   {:+7.1f}%".format(100 * (route["p95_ms"] - before) / before)
+        print(line)
+    print("total {:.1f} req/s over {:.0f} s with {} users".format(report["throughput"], report["duration"],
+                                                                    report["users"]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of load")
+    parser.add_argument("--teams", type=int, default=4)
+    parser.add_argument("--games", type=int, default=100, help="games added to each team")
+    parser.add_argument("--transactions", type=int, default=100, help="transactions added to each team")
+    parser.add_argument("--conditional", action="store_true",
+                        help="revalidate pages with If-None-Match, as a browser refreshing them would")
+    parser.add_argument("--mongomock", action="store_true", help="use mongomock instead of a mongod")
+    parser.add_argument("--output", default="loadtest.json", help="JSON results file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare p95 latencies with")
+    parser.add_argument("--seed", type=int, default=None)
+    arguments = parser.parse_args()
+    random.seed(arguments.seed)
+
+    if arguments.mongomock:
+        use_mongomock()
+    server = load_server()
+    run_id = str(int(time.time()))
+    teams = [LoadTestTeam(number, run_id) for number in range(arguments.teams)]
+    print("Setting up {} teams with {} games and {} transactions each".format(len(teams), arguments.games,
+                                                                              arguments.transactions))
+    for team in teams:
+        set_up_team(server.app, team, arguments.games, arguments.transactions)
+
+    results = {route.name: {"latencies": [], "errors": 0, "statuses": {}} for route in ROUTES}
+    lock = threading.Lock()
+    start = time.time()
+    deadline = start + arguments.duration
+    users = [VirtualUser(server.app, teams[number % len(teams)], deadline, results, lock, arguments.conditional)
+             for number in range(arguments.users)]
+    print("Running {} users for {:.0f} s".format(len(users), arguments.duration))
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.time() - start
+
+    routes = summarise(results, elapsed)
+    report = {"revision": git_revision(),
+              "started": datetime.datetime.utcfromtimestamp(start).isoformat() + "Z",
+              "duration": elapsed,
+              "users": arguments.users,
+              "teams": arguments.teams,
+              "games": arguments.games,
+              "transactions": arguments.transactions,
+              "conditional": arguments.conditional,
+              "database": "mongomock" if arguments.mongomock else "mongod",
+              "throughput": sum(route["requests"] for route in routes.values()) / elapsed,
+              "routes": routes}
+    previous = None
+    if arguments.compare:
+        with open(arguments.compare) as previous_file:
+            previous = json.load(previous_file)
+    print_report(report, previous)
+    with open(arguments.output, "w") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+    print("Results written to " + arguments.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+""" Compact view models for the CFFA tables.
+
+The templates used to format every cell from the raw Mongo documents, looking up long keys such as
+"Date of Game dd-MON-YYYY" three times per date and converting Decimal128 amounts with to_decimal()|round(2), for
+every row of every table. The row classes below hold the display strings computed once when the row is built, and
+use __slots__ to keep the thousands of rows held in cached snapshots small. Rows are built once per tenant data
+version (see dashboard.DashboardSnapshot) so the formatting cost is not paid again on each page view.
+
+"""
+
+import paging
+
+
+class GameRow:
+    """ One game, formatted for the games tables.
+
+    Attributes
+    ----------
+
+    id : str
+        Database ID of the game.
+
+    date : str
+        yyyy/m/d
+
+    players : int
+        Number of players, including guests.
+
+    cost : str
+        Cost of the game, eg: £60.00
+
+    cost_each : str
+        Cost per player.
+
+    player_list : str
+        Names of the players.
+
+    """
+    __slots__ = ("id", "date", "players", "cost", "cost_each", "player_list")
+
+    def __init__(self, game):
+        self.id = str(game.get("_id"))
+        self.date = paging.format_date(game.get(paging.GAME_DATE_KEY))
+        self.players = game.get("Players")
+        self.cost = paging.format_money(game.get("Cost of Game"))
+        self.cost_each = paging.format_money(game.get("Cost Each"))
+        self.player_list = game.get("PlayerList")
+
+    def cells(self):
+        """ Table cells in column order, for the JSON table pagers. """
+        return [self.date, self.players, self.cost, self.cost_each, self.player_list]
+
+
+class TransactionRow:
+    """ One transaction, formatted for the transactions tables.
+
+    Attributes
+    ----------
+
+    date : str
+        yyyy/m/d
+
+    player : str
+        Player who paid or was paid.
+
+    type : str
+        Description of the transaction.
+
+    amount : str
+        eg: £5.00
+
+    """
+    __slots__ = ("date", "player", "type", "amount")
+
+    def __init__(self, transaction, date_separator="/"):
+        self.date = paging.format_date(transaction.get(paging.TRANSACTION_DATE_KEY), date_separator)
+        self.player = transaction.get("Player")
+        self.type = transaction.get("Type")
+        self.amount = paging.format_money(transaction.get("Amount"))
+
+    def cells(self):
+        """ Table cells in column order, for the JSON table pagers. """
+        return [self.date, self.player, self.type, self.amount]
+
+
+class SummaryRow:
+    """ One player's team summary, formatted for the balances tables.
+
+    Attributes
+    ----------
+
+    name : str
+        Player name.
+
+    balance : str
+        eg: £-5.00
+
+    attended : int
+        Number of games attended.
+
+    last_played : str
+        yyyy/m/d
+
+    paid : str
+        Total payments made.
+
+    cost : str
+        Total cost of games attended.
+
+    """
+    __slots__ = ("name", "balance", "attended", "last_played", "paid", "cost")
+
+    def __init__(self, summary):
+        self.name = summary.get("playerName")
+        self.balance = paging.format_money(summary.get("balance"))
+        self.attended = summary.get("gamesAttended")
+        self.last_played = paging.format_date(summary.get("lastPlayed"))
+        self.paid = paging.format_money(summary.get("moniespaid"))
+        self.cost = paging.format_money(summary.get("gamesCost"))
+
+
+class LedgerRow:
+    """ One entry of a player's ledger, formatted for the player summary statement.
+
+    Attributes
+    ----------
+
+    date : str
+        yyyy/m/d
+
+    description : str
+        What the entry is for.
+
+    credit : str
+        Amount paid in, or "" if none.
+
+    debit : str
+        Amount charged, or "" if none.
+
+    balance : str
+        Running balance after the entry.
+
+    overdrawn : bool
+        True when the running balance is negative.
+
+    """
+    __slots__ = ("date", "description", "credit", "debit", "balance", "overdrawn")
+
+    def __init__(self, entry):
+        self.date = paging.format_date(entry.get("date"))
+        self.description = entry.get("description")
+        self.credit = "" if entry.get("credit") in ("", None) else paging.format_money(entry.get("credit"))
+        self.debit = "" if entry.get("debit") in ("", None) else paging.format_money(entry.get("debit"))
+        self.balance = paging.format_money(entry.get("balance"))
+        self.overdrawn = entry.get("balance").to_decimal() < 0
+
+
+def game_rows(games):
+    """ GameRow for each game document. """
+    return [GameRow(game) for game in games]
+
+
+def transaction_rows(transactions, date_separator="/"):
+    """ TransactionRow for each transaction document. """
+    return [TransactionRow(transaction, date_separator) for transaction in transactions]
+
+
+def summary_rows(summaries):
+    """ SummaryRow for each team summary document. """
+    return [SummaryRow(summary) for summary in summaries]
+
+
+def ledger_rows(entries):
+    """ LedgerRow for each ledger entry (see FootballDB.calc_ledger_for_player), built one at a time as a streamed
+    page renders them rather than all before the first byte is sent. """
+    return (LedgerRow(entry) for entry in entries)